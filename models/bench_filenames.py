@@ -0,0 +1,113 @@
+import os
+import re
+import time
+import random
+import argparse
+
+from filename_parser import FilenameParser, _parse_basename
+from synthetic_library import RELEASE_TAGS
+
+LEGACY_CLEANUP = re.compile(
+    r'\b(UHD|1080p|2160p|Blu[- ]?ray|HEVC|HDR|Atmos|WEB|DVDRip|H264|H265)\b',
+    re.IGNORECASE
+)
+LEGACY_TV = re.compile(r"(.*?)\s*S(\d{2})E(\d{2})", re.IGNORECASE)
+LEGACY_MOVIE = re.compile(r"(.+?)\b(19|20)\d{2}\b", re.IGNORECASE)
+
+# Audio/codec tags that look like "season x episode" to a careless pattern
+CODEC_TAGS = ("DTS-HD MA5.1x264", "AAC2.0x264", "DD5.1x265", "AC3.5.1x264", "x264", "x265")
+
+# Names from the catalogs in this folder where FilenameParser deliberately differs
+# from legacy_parse (which leaves the "(" of "Title (2014)" in the title)
+CATALOG_NAMES = {
+    "Despicable Me 2 2013 1080p DTS-HD MA5.1x264.mkv": ("Despicable Me 2", None, None),
+    "The Hobbit The Battle of the Five Armies (2014).mkv": ("The Hobbit The Battle of the Five Armies", None, None),
+    "The Hobbit The Desolation of Smaug (2013).mkv": ("The Hobbit The Desolation of Smaug", None, None),
+}
+
+
+def legacy_parse(filepath):
+    """The original three-pass FilenameParser.parse, kept as the benchmark baseline."""
+    name, ext = os.path.splitext(os.path.basename(filepath))
+
+    if ext.lower() not in FilenameParser.VALID_EXTENSIONS:
+        return None, None, None
+
+    name = name.replace(".", " ")
+    name = LEGACY_CLEANUP.sub("", name).strip()
+
+    tv_match = LEGACY_TV.search(name)
+    if tv_match:
+        return tv_match.group(1).strip(), int(tv_match.group(2)), int(tv_match.group(3))
+
+    movie_match = LEGACY_MOVIE.match(name)
+    if movie_match:
+        return movie_match.group(1).strip(), None, None
+
+    return name.strip(), None, None
+
+
+def build_corpus(count, seed, dotted_ratio=0.5):
+    """
+    Filenames in the layouts both parsers understand: episodes of a few
+    hundred shows and films with or without a year, with release and
+    codec tags and dotted scene-style names mixed in. Every name is unique.
+    """
+    rng = random.Random(seed)
+    extensions = sorted(FilenameParser.VALID_EXTENSIONS)
+    corpus = []
+    for i in range(count):
+        tags = rng.choice(RELEASE_TAGS)
+        codec = rng.choice(CODEC_TAGS)
+        roll = rng.random()
+        if roll < 0.6:
+            name = f"Show {i % 300} S{i % 12 + 1:02d}E{i % 24 + 1:02d} {tags} {codec} GRP{i}"
+        elif roll < 0.9:
+            name = f"Film {i} {rng.randint(1950, 2024)} {tags} {codec}"
+        else:
+            name = f"Film {i} {codec}"
+        if rng.random() < dotted_ratio:
+            name = name.replace(" ", ".")
+        corpus.append(f"/library/{i % 500}/{name}{rng.choice(extensions)}")
+    return corpus
+
+
+def run(parse, corpus, repeat=3, setup=None):
+    """Best of `repeat` runs; setup() is called before each one."""
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        results = parse(corpus)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return results, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FilenameParser against the original parser.")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count, args.seed)
+    print(f"Corpus: {len(corpus)} filenames")
+
+    clear = _parse_basename.cache_clear
+    legacy_results, legacy_time = run(lambda paths: [legacy_parse(p) for p in paths], corpus)
+    results, cold_time = run(lambda paths: [FilenameParser.parse(p) for p in paths], corpus, setup=clear)
+    if results != legacy_results:
+        raise SystemExit("FilenameParser output differs from the legacy parser")
+    for name, expected in CATALOG_NAMES.items():
+        if FilenameParser.parse(name) != expected:
+            raise SystemExit(f"FilenameParser.parse({name!r}) = {FilenameParser.parse(name)}, expected {expected}")
+    _, many_time = run(FilenameParser.parse_many, corpus, setup=clear)
+    # Parsing the same names again, as when files are grouped and then processed.
+    # Libraries larger than FilenameParser.CACHE_SIZE miss here too.
+    _, warm_time = run(FilenameParser.parse_many, corpus)
+
+    for name, elapsed in (("legacy", legacy_time), ("parse", cold_time),
+                          ("parse_many", many_time), ("parse_many warm", warm_time)):
+        print(f"{name:>16}: {elapsed:7.3f}s  {len(corpus) / elapsed:10.0f} names/s  "
+              f"x{legacy_time / elapsed:.2f}")
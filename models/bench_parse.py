@@ -0,0 +1,117 @@
+import io
+import time
+import random
+import argparse
+import contextlib
+
+from create_json import parse_movie_data, extract_season_from_path
+from synthetic_library import make_sidecar_text
+
+
+def legacy_parse_movie_data(file_content, file_path, full_path):
+    """The original split/try/except parser, kept as the benchmark baseline."""
+    movie_data = {
+        "file_path": file_path,
+        "full_path": full_path,
+        "directors": [],
+        "writers": [],
+        "actors": [],
+        "programgenre": []
+    }
+
+    lines = file_content.strip().split('\n')
+    for line in lines:
+        try:
+            key, value = line.split(': ', 1)
+            key = key.strip().lower().replace(' ', '_')
+            value = value.strip()
+
+            if key in ['movieyear', 'episodenumber']:
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass
+            elif key in ['isepisode', 'isepisodic']:
+                value_lower = value.lower()
+                if value_lower == 'true':
+                    value = True
+                elif value_lower == 'false':
+                    value = False
+
+            if key == 'vactor':
+                movie_data['actors'].append(value)
+                continue
+            elif key == 'vdirector':
+                movie_data['directors'].append(value)
+                continue
+            elif key == 'vwriter':
+                movie_data['writers'].append(value)
+                continue
+            elif key == 'vprogramgenre':
+                movie_data['programgenre'].append(value)
+                continue
+            elif key == 'starrating':
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+
+            movie_data[key] = value
+
+        except ValueError:
+            print(f"Skipping line due to formatting error: {line}")
+            continue
+
+    is_tvshow = bool(movie_data.get("isepisode") or movie_data.get("isepisodic"))
+    if is_tvshow:
+        season = movie_data.get("season")
+        if not isinstance(season, int) or season < 1:
+            season_from_path = extract_season_from_path(full_path)
+            movie_data["season"] = season_from_path if season_from_path else 1
+    else:
+        movie_data.pop("season", None)
+
+    return movie_data
+
+
+def build_corpus(count, malformed_ratio, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        malformed = rng.randint(20, 200) if rng.random() < malformed_ratio else 0
+        path = f"Show {i // 100}/Season {i % 9 + 1:02d}/Title {i}.mkv.txt"
+        corpus.append((make_sidecar_text(i, rng, malformed), path, "/library/" + path))
+    return corpus
+
+
+def run(parser, corpus):
+    start = time.perf_counter()
+    # The legacy parser prints every malformed line; time it without a terminal in the way
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = [parser(*item) for item in corpus]
+    return records, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parse_movie_data on a synthetic sidecar corpus.")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--malformed-ratio", type=float, default=0.05,
+                        help="fraction of sidecars with 20-200 malformed lines")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count, args.malformed_ratio, args.seed)
+    size_mb = sum(len(text) for text, _, _ in corpus) / 1e6
+    print(f"Corpus: {len(corpus)} sidecars, {size_mb:.1f} MB")
+
+    legacy_records, legacy_time = run(legacy_parse_movie_data, corpus)
+    season_cache = {}
+    records, parse_time = run(
+        lambda *item: parse_movie_data(*item, season_cache=season_cache), corpus
+    )
+    if records != legacy_records:
+        raise SystemExit("parse_movie_data output differs from the legacy parser")
+
+    for name, elapsed in (("legacy", legacy_time), ("parse_movie_data", parse_time)):
+        print(f"{name:>16}: {elapsed:7.2f}s  {len(corpus) / elapsed:10.0f} sidecars/s")
+    print(f"{'speedup':>16}: {legacy_time / parse_time:7.2f}x")
@@ -0,0 +1,271 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from synthetic_library import generate_library, make_sidecar_text
+
+BENCHMARKS = ("catalog", "parse", "filenames", "enrich")
+
+SIZES = {
+    "small": dict(films=200, series=10, seasons=2, episodes=10),
+    "medium": dict(films=2000, series=100, seasons=3, episodes=10),
+    "large": dict(films=10000, series=400, seasons=5, episodes=15),
+}
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[int(q * (len(sorted_values) - 1))]
+
+
+def summarize(count, seconds, latencies):
+    latencies.sort()
+    return {
+        "files": count,
+        "seconds": round(seconds, 4),
+        "files_per_sec": round(count / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+    }
+
+
+def timed_each(fn, items):
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - start, latencies
+
+# ------------------- Benchmarks -------------------
+# Each runs in its own process so peak RSS is measured per benchmark.
+
+def bench_catalog(library, options):
+    from create_json import text_files_to_json
+    from instrumentation import Metrics
+
+    class SampledMetrics(Metrics):
+        """Metrics that also keep every observation, for per-file percentiles."""
+
+        def __init__(self):
+            super().__init__()
+            self.samples = {}
+
+        def observe(self, stage, seconds):
+            super().observe(stage, seconds)
+            with self._lock:
+                self.samples.setdefault(stage, []).append(seconds)
+
+    # Throughput and per-file latency come from the same run, with no
+    # warm-up pass over the sidecars beforehand
+    metrics = SampledMetrics()
+    output = os.path.join(tempfile.mkdtemp(), "catalog.json")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = text_files_to_json(library, output, workers=options["workers"],
+                                     use_processes=options["processes"], metrics=metrics)
+    seconds = time.perf_counter() - start
+    shutil.rmtree(os.path.dirname(output))
+    # Every sidecar is new, so each one has a read and a parse sample, in order
+    latencies = [read + parse for read, parse in
+                 zip(metrics.samples.get("read", []), metrics.samples.get("parse", []))]
+    return summarize(summary["added"], seconds, latencies)
+
+
+def bench_parse(library, options):
+    from create_json import parse_movie_data
+
+    rng = random.Random(options["seed"])
+    corpus = [
+        (make_sidecar_text(i, rng, rng.randint(20, 200) if rng.random() < options["malformed_ratio"] else 0),
+         f"Show/Season {i % 9 + 1:02d}/{i}.mkv.txt", f"/library/Show/Season {i % 9 + 1:02d}/{i}.mkv.txt")
+        for i in range(options["corpus"])
+    ]
+    season_cache = {}
+    seconds, latencies = timed_each(
+        lambda item: parse_movie_data(*item, season_cache=season_cache), corpus
+    )
+    return summarize(len(corpus), seconds, latencies)
+
+
+def _media_paths(library):
+    from filename_parser import is_media_file
+
+    return [
+        os.path.join(root, name)
+        for root, _, files in os.walk(library)
+        for name in files
+        if is_media_file(name)
+    ]
+
+
+def bench_filenames(library, options):
+    from filename_parser import FilenameParser
+
+    paths = _media_paths(library)
+    seconds, latencies = timed_each(FilenameParser.parse, paths)
+    return summarize(len(paths), seconds, latencies)
+
+
+def bench_enrich(library, options):
+    from fake_omdb_server import FakeOmdbServer
+    from get_movie_metadata import MediaProcessor, OmdbClient
+
+    paths = sorted(_media_paths(library))
+    with FakeOmdbServer(latency=options["latency"]) as server:
+        processor = MediaProcessor(OmdbClient("bench", base_url=server.url))
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds, latencies = timed_each(processor.process, paths)
+        result = summarize(len(paths), seconds, latencies)
+        result["requests"] = dict(server.requests)
+    return result
+
+
+def _run_in_child(name, library, options):
+    result = globals()["bench_" + name](library, options)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+# ------------------- Harness -------------------
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names, shape, options, library=None):
+    """
+    Generates a synthetic library of the given shape (unless one is passed)
+    and runs each named benchmark in a fresh process. Returns the results
+    document that is saved with --output.
+    """
+    owns_library = library is None
+    if owns_library:
+        library = tempfile.mkdtemp(prefix="bench_library_")
+        generate_library(library, malformed_ratio=options["malformed_ratio"],
+                         nesting=2, nested_ratio=0.1, seed=options["seed"], **shape)
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    try:
+        for name in names:
+            # enrich writes sidecars and posters, so give it its own copy without sidecars
+            target = library
+            if name == "enrich":
+                target = tempfile.mkdtemp(prefix="bench_enrich_")
+                generate_library(target, sidecars=False, seed=options["seed"], **shape)
+            # Not a multiprocessing.Pool: its workers are daemonic and cannot start --processes pools
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                results[name] = pool.submit(_run_in_child, name, target, options).result()
+            if name == "enrich":
+                shutil.rmtree(target)
+            print_result(name, results[name])
+    finally:
+        if owns_library:
+            shutil.rmtree(library)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "shape": shape,
+        "options": options,
+        "results": results,
+    }
+
+
+def print_result(name, result):
+    print(
+        f"{name:>10}: {result['files']:7d} files  {result['files_per_sec']:10.1f} files/s  "
+        f"p50 {result['p50_ms']:8.3f} ms  p99 {result['p99_ms']:8.3f} ms  "
+        f"peak RSS {result['peak_rss_mb']:7.1f} MB"
+    )
+
+
+def print_comparison(baseline, current):
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}:")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("files_per_sec"):
+            continue
+        ratio = result["files_per_sec"] / before["files_per_sec"]
+        rss = result["peak_rss_mb"] - before.get("peak_rss_mb", 0)
+        print(f"{name:>10}: throughput x{ratio:.2f}, p99 {before['p99_ms']:.3f} -> "
+              f"{result['p99_ms']:.3f} ms, peak RSS {rss:+.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the models/ indexing and enrichment pipeline.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--films", type=int)
+    parser.add_argument("--series", type=int)
+    parser.add_argument("--seasons", type=int)
+    parser.add_argument("--episodes", type=int)
+    parser.add_argument("--library", default=None,
+                        help="benchmark an existing library instead of a generated one")
+    parser.add_argument("--malformed-ratio", type=float, default=0.02)
+    parser.add_argument("--corpus", type=int, default=100_000,
+                        help="number of in-memory sidecars for the parse benchmark")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--processes", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds the fake OMDb server waits per request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="save results as JSON")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    shape = dict(SIZES[args.size])
+    for key in ("films", "series", "seasons", "episodes"):
+        if getattr(args, key) is not None:
+            shape[key] = getattr(args, key)
+    options = {
+        "workers": args.workers,
+        "processes": args.processes,
+        "latency": args.latency,
+        "malformed_ratio": args.malformed_ratio,
+        "corpus": args.corpus,
+        "seed": args.seed,
+    }
+
+    document = run_benchmarks(args.only, shape, options, args.library)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=4)
+        print(f"Saved results to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), document)
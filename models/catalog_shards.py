@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+from catalog_writer import CATALOG_FORMATS, catalog_end, encode_record, make_temp_file
+
+SHARD_KEYS = ("series", "folder")
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+
+_UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+
+
+def shard_file_name(shard: str, fmt: str) -> str:
+    """
+    A file name for a shard; names that are not already safe, or that
+    would clash with INDEX_FILE, get a hash suffix to stay unique.
+    """
+    ext = ".jsonl" if fmt == "jsonl" else ".json"
+    slug = _UNSAFE_CHARS.sub("_", shard).strip("._")[:60]
+    if slug == shard and slug.lower() != os.path.splitext(INDEX_FILE)[0]:
+        return shard + ext
+    return f"{slug or 'shard'}-{hashlib.sha1(shard.encode('utf-8')).hexdigest()[:8]}{ext}"
+
+
+def load_index(output_dir: str) -> dict:
+    """Loads output_dir/index.json, or returns an empty index if it is missing or unreadable."""
+    try:
+        with open(os.path.join(output_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable shard index in {output_dir}: {e}")
+        return {}
+    return index if index.get("version") == INDEX_VERSION else {}
+
+
+class _Shard:
+    __slots__ = ("name", "tmp_file", "file", "count", "digest")
+
+    def __init__(self, name: str, tmp_file: str):
+        self.name = name
+        self.tmp_file = tmp_file
+        self.file = None
+        self.count = 0
+        self.digest = hashlib.sha256()
+
+
+class ShardedCatalogWriter:
+    """
+    Writes the catalog as one file per shard plus a small index.json, so
+    consumers can load a single series instead of the whole catalog.
+
+    Shards are keyed by seriesid for episodes (films share a "films"
+    shard) with key="series", or by the top-level folder under root_dir
+    with key="folder". Each shard is a catalog in the given format (see
+    catalog_writer.CatalogWriter).
+
+    index.json lists every shard's file, record count, content hash and
+    last-modified time, and maps each programid to its shard. On close()
+    only shards whose content changed are replaced, so an unchanged
+    shard keeps its file and modified time. Shards that are gone are
+    removed. Records are appended to per-shard temp files, with at most
+    MAX_OPEN_SHARDS open at once, so memory does not grow with the
+    catalog.
+    """
+
+    MAX_OPEN_SHARDS = 64
+
+    def __init__(self, output_dir: str, key: str = "series", fmt: str = "pretty", root_dir: str = None):
+        if key not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {key}")
+        if fmt not in CATALOG_FORMATS:
+            raise ValueError(f"Unknown catalog format: {fmt}")
+        if key == "folder" and root_dir is None:
+            raise ValueError("Sharding by folder needs the catalog root_dir")
+        self.output_dir = output_dir
+        self.key = key
+        self.fmt = fmt
+        self.root_dir = root_dir
+        self.count = 0
+        self.changed = []
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._shards = {}
+        self._open = OrderedDict()
+        self._programs = {}
+
+    def shard_for(self, record: dict) -> str:
+        if self.key == "folder":
+            relative = os.path.relpath(record.get("file_path", ""), self.root_dir)
+            head = relative.split(os.sep, 1)
+            return head[0] if len(head) > 1 else "_root"
+        if record.get("isepisodic") is True or record.get("isepisode") is True:
+            series_id = record.get("seriesid")
+            return series_id if series_id and series_id != "N/A" else "_series"
+        return "films"
+
+    def _file_for(self, shard: _Shard):
+        if shard.file is None:
+            if len(self._open) >= self.MAX_OPEN_SHARDS:
+                _, oldest = self._open.popitem(last=False)
+                oldest.file.close()
+                oldest.file = None
+            shard.file = open(shard.tmp_file, "a", encoding="utf-8")
+            self._open[shard.name] = shard
+        else:
+            self._open.move_to_end(shard.name)
+        return shard.file
+
+    def write(self, record: dict):
+        name = self.shard_for(record)
+        shard = self._shards.get(name)
+        if shard is None:
+            fd, tmp_file = make_temp_file(os.path.join(self.output_dir, shard_file_name(name, self.fmt)))
+            os.close(fd)
+            shard = self._shards[name] = _Shard(name, tmp_file)
+
+        text = encode_record(record, self.fmt, shard.count == 0)
+        self._file_for(shard).write(text)
+        shard.digest.update(text.encode("utf-8"))
+        shard.count += 1
+        self.count += 1
+
+        program_id = record.get("programid")
+        if program_id is not None:
+            self._programs.setdefault(str(program_id), name)
+
+    def close(self):
+        """Finishes every shard, replaces the ones that changed and writes the index."""
+        previous = load_index(self.output_dir).get("shards", {})
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        shards = {}
+        for name in sorted(self._shards):
+            shard = self._shards[name]
+            end = catalog_end(self.fmt, shard.count)
+            self._file_for(shard).write(end)
+            shard.digest.update(end.encode("utf-8"))
+            shard.file.close()
+            shard.file = None
+            self._open.pop(name, None)
+
+            file_name = shard_file_name(name, self.fmt)
+            target = os.path.join(self.output_dir, file_name)
+            sha256 = shard.digest.hexdigest()
+            old = previous.get(name)
+            if old and old.get("sha256") == sha256 and old.get("file") == file_name and os.path.exists(target):
+                os.remove(shard.tmp_file)
+                modified = old.get("modified", now)
+            else:
+                os.replace(shard.tmp_file, target)
+                modified = now
+                self.changed.append(name)
+            shards[name] = {"file": file_name, "count": shard.count, "sha256": sha256, "modified": modified}
+
+        for name, old in previous.items():
+            if name not in shards and old.get("file") not in {entry["file"] for entry in shards.values()}:
+                try:
+                    os.remove(os.path.join(self.output_dir, old["file"]))
+                except (KeyError, FileNotFoundError):
+                    pass
+                self.changed.append(name)
+
+        index = {
+            "version": INDEX_VERSION,
+            "key": self.key,
+            "format": self.fmt,
+            "count": self.count,
+            "shards": shards,
+            "programs": self._programs,
+        }
+        fd, tmp_file = make_temp_file(os.path.join(self.output_dir, INDEX_FILE))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_file, os.path.join(self.output_dir, INDEX_FILE))
+
+    def abort(self):
+        """Discards every shard temp file, leaving the existing shards and index untouched."""
+        for shard in self._shards.values():
+            if shard.file is not None:
+                shard.file.close()
+            try:
+                os.remove(shard.tmp_file)
+            except FileNotFoundError:
+                pass
+        self._open.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
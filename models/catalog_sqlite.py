@@ -0,0 +1,214 @@
+import os
+import sqlite3
+
+from catalog_writer import make_temp_file
+
+# Same tables as controllers/sql/films_sql_tables.js, in SQLite syntax. films also
+# keeps episodeid and season so single episodes can be looked up, and the
+# media_probe fields (NULL when the file was not probed).
+SCHEMA = [
+    """CREATE TABLE films (
+        film_id INTEGER PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        full_path TEXT,
+        movieyear INTEGER,
+        title TEXT,
+        description TEXT,
+        isepisode INTEGER DEFAULT 0,
+        isepisodic INTEGER DEFAULT 0,
+        seriesid TEXT,
+        programid TEXT,
+        episodeid TEXT,
+        season INTEGER,
+        starrating REAL,
+        mpaarating TEXT,
+        image TEXT,
+        duration REAL,
+        container TEXT,
+        videocodec TEXT,
+        audiocodec TEXT,
+        bitrate INTEGER,
+        directplay INTEGER
+    )""",
+    "CREATE TABLE actors (actor_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE directors (director_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE writers (writer_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE genres (genre_id INTEGER PRIMARY KEY, genre_name TEXT NOT NULL UNIQUE)",
+    """CREATE TABLE filmactors (
+        film_id INTEGER NOT NULL REFERENCES films(film_id) ON DELETE CASCADE,
+        actor_id INTEGER NOT NULL REFERENCES actors(actor_id) ON DELETE CASCADE,
+        PRIMARY KEY (film_id, actor_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE filmdirectors (
+        film_id INTEGER NOT NULL REFERENCES films(film_id) ON DELETE CASCADE,
+        director_id INTEGER NOT NULL REFERENCES directors(director_id) ON DELETE CASCADE,
+        PRIMARY KEY (film_id, director_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE filmwriters (
+        film_id INTEGER NOT NULL REFERENCES films(film_id) ON DELETE CASCADE,
+        writer_id INTEGER NOT NULL REFERENCES writers(writer_id) ON DELETE CASCADE,
+        PRIMARY KEY (film_id, writer_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE filmgenres (
+        film_id INTEGER NOT NULL REFERENCES films(film_id) ON DELETE CASCADE,
+        genre_id INTEGER NOT NULL REFERENCES genres(genre_id) ON DELETE CASCADE,
+        PRIMARY KEY (film_id, genre_id)
+    ) WITHOUT ROWID""",
+]
+
+# Created after the bulk load, which is much faster than maintaining them row by row
+INDEXES = [
+    "CREATE INDEX idx_films_programid ON films (programid)",
+    "CREATE INDEX idx_films_seriesid ON films (seriesid, season)",
+    "CREATE INDEX idx_films_title ON films (title)",
+    "CREATE INDEX idx_films_year ON films (movieyear)",
+    "CREATE INDEX idx_fa_actor ON filmactors (actor_id)",
+    "CREATE INDEX idx_fd_director ON filmdirectors (director_id)",
+    "CREATE INDEX idx_fw_writer ON filmwriters (writer_id)",
+    "CREATE INDEX idx_fg_genre ON filmgenres (genre_id)",
+]
+
+FILM_COLUMNS = (
+    "file_path", "full_path", "movieyear", "title", "description", "isepisode", "isepisodic",
+    "seriesid", "programid", "episodeid", "season", "starrating", "mpaarating", "image",
+    "duration", "container", "videocodec", "audiocodec", "bitrate", "directplay"
+)
+
+# record list field -> (people table, name column, join table, join id column)
+RELATIONS = {
+    "actors": ("actors", "name", "filmactors", "actor_id"),
+    "directors": ("directors", "name", "filmdirectors", "director_id"),
+    "writers": ("writers", "name", "filmwriters", "writer_id"),
+    "programgenre": ("genres", "genre_name", "filmgenres", "genre_id"),
+}
+
+
+def _number(value, kind):
+    if isinstance(value, bool):
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SqliteCatalogWriter:
+    """
+    Writes catalog records into an indexed SQLite database shaped like the
+    MySQL schema in controllers/sql/films_sql_tables.js.
+
+    Rows are buffered and inserted with executemany in batches inside one
+    transaction, and indexes are built once at the end. The database is
+    built in a temp file and renamed over db_path on close(), so it has
+    the same write()/close()/abort() interface as CatalogWriter.
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.count = 0
+        fd, self.tmp_file = make_temp_file(db_path)
+        os.close(fd)
+
+        self._db = sqlite3.connect(self.tmp_file, isolation_level=None)
+        # The file is only renamed into place once complete, so durability can wait
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("BEGIN")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+        self._ids = {field: {} for field in RELATIONS}
+        self._films = []
+        self._people = {field: [] for field in RELATIONS}
+        self._links = {field: [] for field in RELATIONS}
+
+    def write(self, record: dict):
+        self.count += 1
+        film_id = self.count
+        self._films.append((film_id,) + tuple(
+            self._column(record, column) for column in FILM_COLUMNS
+        ))
+
+        for field in RELATIONS:
+            ids = self._ids[field]
+            linked = set()
+            for name in record.get(field, ()):
+                person_id = ids.get(name)
+                if person_id is None:
+                    person_id = ids[name] = len(ids) + 1
+                    self._people[field].append((person_id, name))
+                if person_id not in linked:
+                    linked.add(person_id)
+                    self._links[field].append((film_id, person_id))
+
+        if len(self._films) >= self.BATCH_SIZE:
+            self._flush()
+
+    @staticmethod
+    def _column(record: dict, column: str):
+        value = record.get(column)
+        if column in ("isepisode", "isepisodic"):
+            return 1 if value is True else 0
+        if column == "directplay":
+            return None if not isinstance(value, bool) else int(value)
+        if column in ("movieyear", "season", "bitrate"):
+            return _number(value, int)
+        if column in ("starrating", "duration"):
+            return _number(value, float)
+        return value
+
+    def _flush(self):
+        placeholders = ", ".join("?" * (len(FILM_COLUMNS) + 1))
+        self._db.executemany(
+            f"INSERT INTO films (film_id, {', '.join(FILM_COLUMNS)}) VALUES ({placeholders})",
+            self._films
+        )
+        for field, (table, name_column, join_table, id_column) in RELATIONS.items():
+            self._db.executemany(
+                f"INSERT INTO {table} ({id_column}, {name_column}) VALUES (?, ?)",
+                self._people[field]
+            )
+            self._db.executemany(
+                f"INSERT INTO {join_table} (film_id, {id_column}) VALUES (?, ?)",
+                self._links[field]
+            )
+            self._people[field].clear()
+            self._links[field].clear()
+        self._films.clear()
+
+    def close(self):
+        """Flushes remaining rows, builds the indexes and renames the database into place."""
+        self._flush()
+        for statement in INDEXES:
+            self._db.execute(statement)
+        self._db.execute("COMMIT")
+        self._db.execute("ANALYZE")
+        self._db.close()
+        os.replace(self.tmp_file, self.db_path)
+
+    def abort(self):
+        self._db.close()
+        try:
+            os.remove(self.tmp_file)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def export_sqlite(records, db_path: str) -> int:
+    """Writes an iterable of catalog records to db_path; returns the number written."""
+    with SqliteCatalogWriter(db_path) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
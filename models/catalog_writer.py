@@ -0,0 +1,88 @@
+import os
+import json
+import tempfile
+
+CATALOG_FORMATS = ("pretty", "compact", "jsonl")
+
+
+def make_temp_file(target: str):
+    """
+    Creates a temp file next to target, to be os.replace()d over it once
+    complete. Returns (fd, path).
+    """
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, tmp_file = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(target) + ".", suffix=".tmp"
+    )
+    # mkstemp creates 0600 files; give the output the usual umask-based mode
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp_file, 0o666 & ~umask)
+    return fd, tmp_file
+
+
+def encode_record(record: dict, fmt: str, first: bool) -> str:
+    """Returns the text CatalogWriter writes for one record, separator included."""
+    if fmt == "jsonl":
+        return json.dumps(record, separators=(",", ":")) + "\n"
+    if fmt == "compact":
+        return ("[\n" if first else ",\n") + json.dumps(record, separators=(",", ":"))
+    return ("[\n    " if first else ",\n    ") + json.dumps(record, indent=4).replace("\n", "\n    ")
+
+
+def catalog_end(fmt: str, count: int) -> str:
+    """Returns the text that finishes a catalog of count records."""
+    if fmt == "jsonl":
+        return ""
+    return "\n]" if count else "[]"
+
+
+class CatalogWriter:
+    """
+    Streams catalog records to disk as they are produced.
+
+    Records are written to a temp file in the destination directory which is
+    atomically renamed over the target on close(), so readers never see a
+    half-written catalog. Formats:
+    - pretty:  a JSON array indented like json.dump(..., indent=4)
+    - compact: a JSON array with one minified record per line
+    - jsonl:   JSON Lines, one record per line, no enclosing array
+    """
+
+    def __init__(self, output_file: str, fmt: str = "pretty"):
+        if fmt not in CATALOG_FORMATS:
+            raise ValueError(f"Unknown catalog format: {fmt}")
+        self.output_file = output_file
+        self.fmt = fmt
+        self.count = 0
+
+        fd, self.tmp_file = make_temp_file(output_file)
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        self._file.write(encode_record(record, self.fmt, self.count == 0))
+        self.count += 1
+
+    def close(self):
+        """Finishes the document and renames it into place."""
+        self._file.write(catalog_end(self.fmt, self.count))
+        self._file.close()
+        os.replace(self.tmp_file, self.output_file)
+
+    def abort(self):
+        """Discards the temp file, leaving any existing catalog untouched."""
+        self._file.close()
+        try:
+            os.remove(self.tmp_file)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,141 @@
+import os
+import json
+
+# Values worth sharing between records: series-level fields repeat across every episode
+INTERNED_FIELDS = {"title", "programid", "seriesid", "mpaarating", "image", "movieyear",
+                   "starrating", "season", "isepisode", "isepisodic"}
+
+
+class CompactRecord:
+    """
+    A catalog record stored in a fraction of the memory of the dict that
+    parse_movie_data() returns.
+
+    file_path and full_path share one file name and keep their directory
+    part as an interned prefix. The remaining fields are kept as a shape
+    (the tuple of keys, shared by every record with the same keys in the
+    same order) and a tuple of values, with list fields stored as tuples of
+    interned strings. to_dict() rebuilds the original dict, key order
+    included, so the JSON output does not change.
+    """
+
+    __slots__ = ("file_dir", "full_dir", "name", "shape", "values")
+
+    def __init__(self, file_dir, full_dir, name, shape, values):
+        self.file_dir = file_dir
+        self.full_dir = full_dir
+        self.name = name
+        self.shape = shape
+        self.values = values
+
+    def to_dict(self) -> dict:
+        record = {}
+        if self.file_dir is not None:
+            record["file_path"] = self.file_dir + self.name
+            record["full_path"] = self.full_dir + self.name
+        for key, value in zip(self.shape, self.values):
+            record[key] = list(value) if type(value) is tuple else value
+        return record
+
+    def get(self, key, default=None):
+        if self.file_dir is not None:
+            if key == "file_path":
+                return self.file_dir + self.name
+            if key == "full_path":
+                return self.full_dir + self.name
+        try:
+            value = self.values[self.shape.index(key)]
+        except ValueError:
+            return default
+        return list(value) if type(value) is tuple else value
+
+
+def _split_path(path):
+    cut = path.rfind(os.sep) + 1
+    if os.altsep:
+        cut = max(cut, path.rfind(os.altsep) + 1)
+    return path[:cut], path[cut:]
+
+
+class RecordPacker:
+    """
+    Packs record dicts into CompactRecords that share one table of
+    interned strings: directory prefixes, people, genres, keys, shapes and
+    the repeated fields in INTERNED_FIELDS. Use one packer per catalog.
+    """
+
+    def __init__(self):
+        self._strings = {}
+        self._numbers = {}
+        self._shapes = {}
+
+    def intern(self, value):
+        if type(value) is str:
+            return self._strings.setdefault(value, value)
+        if type(value) in (int, float):
+            # 1 == 1.0, so numbers are keyed by type as well
+            return self._numbers.setdefault((type(value), value), value)
+        return value
+
+    def pack(self, record: dict) -> CompactRecord:
+        intern = self.intern
+        items = iter(record.items())
+        file_dir = full_dir = name = None
+
+        keys = list(record)
+        if keys[:2] == ["file_path", "full_path"]:
+            file_dir, file_name = _split_path(record["file_path"])
+            full_dir, full_name = _split_path(record["full_path"])
+            if file_name == full_name and isinstance(file_name, str):
+                file_dir, full_dir, name = intern(file_dir), intern(full_dir), file_name
+                next(items)
+                next(items)
+            else:
+                file_dir = full_dir = None
+
+        shape = []
+        values = []
+        for key, value in items:
+            shape.append(intern(key))
+            if type(value) is list:
+                value = tuple(intern(item) for item in value)
+            elif key in INTERNED_FIELDS:
+                value = intern(value)
+            values.append(value)
+
+        shape = tuple(shape)
+        shape = self._shapes.setdefault(shape, shape)
+        return CompactRecord(file_dir, full_dir, name, shape, tuple(values))
+
+    def object_hook(self, obj: dict):
+        """json object_hook that packs records as they are decoded, before the next one is built."""
+        if "file_path" in obj and "full_path" in obj:
+            return self.pack(obj)
+        return obj
+
+
+def record_dict(record) -> dict:
+    """Returns a plain dict for either a CompactRecord or a record dict."""
+    return record.to_dict() if type(record) is CompactRecord else record
+
+
+def json_default(obj):
+    """default= for json.dump()ing structures that contain CompactRecords."""
+    if type(obj) is CompactRecord:
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def load_catalog(catalog_file: str, packer: RecordPacker = None) -> list:
+    """
+    Loads a JSON catalog (pretty, compact or jsonl) as a list of
+    CompactRecords, packing each record as soon as it is decoded.
+    """
+    if packer is None:
+        packer = RecordPacker()
+    with open(catalog_file, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            return json.load(f, object_hook=packer.object_hook)
+        return [json.loads(line, object_hook=packer.object_hook) for line in f if line.strip()]
@@ -1,9 +1,27 @@
 import os
+import sys
 import json
 import re
+import time
+import argparse
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional
 
-def extract_season_from_path(path: str) -> Optional[int]:
+from catalog_writer import CatalogWriter, CATALOG_FORMATS, make_temp_file
+from catalog_sqlite import SqliteCatalogWriter
+from catalog_shards import ShardedCatalogWriter, SHARD_KEYS
+from search_index import SearchIndexWriter
+from compact_records import RecordPacker, json_default, record_dict
+from instrumentation import Metrics, add_instrumentation_arguments, profile_option
+
+MANIFEST_VERSION = 1
+
+# Match 'season' or 's' followed by 1-2 digit number anywhere in the folder name
+SEASON_PATTERN = re.compile(r"(?:season[\s._-]*|s)(\d{1,2})")
+
+def extract_season_from_path(path: str, cache: Optional[dict] = None) -> Optional[int]:
     """
     Extract season number from parent folders of a file.
     Handles folder names like:
@@ -12,22 +30,69 @@ def extract_season_from_path(path: str) -> Optional[int]:
     - S03
     - Season 02 - 2008
     - s3 comedy
+
+    If a cache dict is given, results are memoized per directory so files
+    in the same folder resolve their season only once.
     """
     normalized_path = os.path.normpath(path)
-    parts = normalized_path.split(os.sep)
+    directory = os.path.dirname(normalized_path)
+    if cache is not None and directory in cache:
+        return cache[directory]
 
+    season = None
     # Check folders from bottom up (skip the filename)
-    for folder in reversed(parts[:-1]):
-        folder_lower = folder.lower()
-        # Match 'season' or 's' followed by 1-2 digit number anywhere in the folder name
-        match = re.search(r"(?:season[\s._-]*|s)(\d{1,2})", folder_lower)
+    for folder in reversed(directory.split(os.sep)):
+        match = SEASON_PATTERN.search(folder.lower())
         if match:
-            return int(match.group(1))
-    return None
+            season = int(match.group(1))
+            break
+
+    if cache is not None:
+        cache[directory] = season
+    return season
+
+# Sidecar keys (lowercased, spaces as underscores) that need special handling
+LIST_FIELDS = {
+    "vactor": "actors",
+    "vdirector": "directors",
+    "vwriter": "writers",
+    "vprogramgenre": "programgenre",
+    "vversion": "versions",
+    "vduplicate": "duplicates",
+}
+INT_FIELDS = {"movieyear", "episodenumber", "bitrate"}
+BOOL_FIELDS = {"isepisode", "isepisodic", "directplay"}
+FLOAT_FIELDS = {"starrating", "duration"}
+
+_LIST, _INT, _BOOL, _FLOAT, _PLAIN = range(5)
+_BOOL_VALUES = {"true": True, "false": False}
+
+# raw key as written in the sidecar -> (normalized key, field kind)
+_KEY_CACHE = {}
+_KEY_CACHE_LIMIT = 4096
+
+def _resolve_key(raw_key):
+    key = raw_key.strip().lower().replace(' ', '_')
+    if key in LIST_FIELDS:
+        resolved = (LIST_FIELDS[key], _LIST)
+    elif key in INT_FIELDS:
+        resolved = (key, _INT)
+    elif key in BOOL_FIELDS:
+        resolved = (key, _BOOL)
+    elif key in FLOAT_FIELDS:
+        resolved = (key, _FLOAT)
+    else:
+        resolved = (key, _PLAIN)
+    if len(_KEY_CACHE) < _KEY_CACHE_LIMIT:
+        _KEY_CACHE[raw_key] = resolved
+    return resolved
 
-def parse_movie_data(file_content, file_path, full_path):
+def parse_movie_data(file_content, file_path, full_path, stats=None, season_cache=None):
     """
     Parses the content of a single text file into a dictionary (movie object).
+    Lines without a "key : value" separator are skipped; if a stats dict is
+    given, their number is added to stats["malformed_lines"]. season_cache
+    is passed on to extract_season_from_path.
     """
     movie_data = {
         "file_path": file_path,
@@ -38,50 +103,41 @@ def parse_movie_data(file_content, file_path, full_path):
         "programgenre": []
     }
 
-    lines = file_content.strip().split('\n')
-    for line in lines:
-        try:
-            key, value = line.split(': ', 1)
-            key = key.strip().lower().replace(' ', '_')
-            value = value.strip()
-
-            # Convert numeric and boolean values
-            if key in ['movieyear', 'episodenumber']:
-                try:
-                    value = int(value)
-                except ValueError:
-                    pass
-            elif key in ['isepisode', 'isepisodic']:
-                value_lower = value.lower()
-                if value_lower == 'true':
-                    value = True
-                elif value_lower == 'false':
-                    value = False
-
-            # Handle list fields
-            if key == 'vactor':
-                movie_data['actors'].append(value)
-                continue
-            elif key == 'vdirector':
-                movie_data['directors'].append(value)
-                continue
-            elif key == 'vwriter':
-                movie_data['writers'].append(value)
-                continue
-            elif key == 'vprogramgenre':
-                movie_data['programgenre'].append(value)
-                continue
-            elif key == 'starrating':
-                try:
-                    value = float(value)
-                except ValueError:
-                    pass
+    malformed = 0
+    key_cache = _KEY_CACHE
+    for line in file_content.strip().split('\n'):
+        raw_key, sep, value = line.partition(': ')
+        if not sep:
+            malformed += 1
+            continue
 
-            movie_data[key] = value
+        key, kind = key_cache.get(raw_key) or _resolve_key(raw_key)
+        value = value.strip()
 
-        except ValueError:
-            print(f"Skipping line due to formatting error: {line}")
+        if kind == _LIST:
+            try:
+                movie_data[key].append(value)
+            except KeyError:
+                # versions/duplicates only appear in sidecars of titles with several files
+                movie_data[key] = [value]
             continue
+        if kind == _INT:
+            try:
+                value = int(value)
+            except ValueError:
+                pass
+        elif kind == _BOOL:
+            value = _BOOL_VALUES.get(value.lower(), value)
+        elif kind == _FLOAT:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+
+        movie_data[key] = value
+
+    if stats is not None and malformed:
+        stats["malformed_lines"] = stats.get("malformed_lines", 0) + malformed
 
     # ---------- TV SHOW SEASON HANDLING ----------
     is_tvshow = bool(movie_data.get("isepisode") or movie_data.get("isepisodic"))
@@ -89,42 +145,361 @@ def parse_movie_data(file_content, file_path, full_path):
     if is_tvshow:
         season = movie_data.get("season")
         if not isinstance(season, int) or season < 1:
-            season_from_path = extract_season_from_path(full_path)
+            season_from_path = extract_season_from_path(full_path, season_cache)
             movie_data["season"] = season_from_path if season_from_path else 1
     else:
         movie_data.pop("season", None)
 
     return movie_data
 
-def text_files_to_json(root_dir, output_json_file):
+def manifest_path_for(output_json_file):
+    """
+    Returns the default manifest path stored next to the JSON catalog,
+    e.g. ./tv_shows_data.json -> ./tv_shows_data.manifest.json
+    """
+    base, _ = os.path.splitext(output_json_file)
+    return base + ".manifest.json"
+
+def load_manifest(manifest_file, packer=None):
+    """
+    Loads a manifest mapping sidecar path -> {mtime, size, record}.
+    Returns an empty manifest if the file is missing or unreadable.
+    With a compact_records.RecordPacker, records are loaded as
+    CompactRecords.
+    """
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f, object_hook=packer.object_hook if packer is not None else None)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {manifest_file}: {e}")
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+def save_manifest(manifest_file, files):
+    """
+    Writes the manifest next to the catalog, replacing the old one atomically.
+    """
+    fd, tmp_file = make_temp_file(manifest_file)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, f, default=json_default)
+    os.replace(tmp_file, manifest_file)
+
+def iter_sidecars(root_dir, metrics=None):
+    """
+    Yields (file_path, full_path) for every .txt sidecar under root_dir.
+    Directories and files are visited in sorted order so the catalog
+    order does not depend on the filesystem. Time spent listing
+    directories is recorded as the "walk" stage of metrics, if given.
+    """
+    walker = os.walk(root_dir)
+    while True:
+        start = time.perf_counter()
+        try:
+            dirpath, dirnames, filenames = next(walker)
+        except StopIteration:
+            return
+        finally:
+            if metrics:
+                metrics.observe("walk", time.perf_counter() - start)
+        dirnames.sort()
+        real_dirpath = os.path.realpath(dirpath)
+        for filename in sorted(filenames):
+            if filename.endswith('.txt'):
+                yield os.path.join(dirpath, filename), os.path.join(real_dirpath, filename)
+
+def walk_order_key(file_path):
+    """Sort key that orders sidecar paths the way iter_sidecars visits them."""
+    head, tail = os.path.split(file_path)
+    return head.split(os.sep), tail
+
+def _read_sidecar(file_path, entry):
+    """
+    Stats a sidecar and reads it, unless its manifest entry is still current.
+    Returns (stat, content, seconds); content is None for unchanged files.
+    """
+    start = time.perf_counter()
+    st = os.stat(file_path)
+    if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+        return st, None, time.perf_counter() - start
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return st, content, time.perf_counter() - start
+
+# Season memo used by _parse_content in process pool workers, which can't share the run's dict
+_worker_season_cache = {}
+
+def _parse_content(content, file_path, full_path, season_cache=None):
+    """Returns (record, malformed line count, seconds); (None, 0, 0) for unchanged files."""
+    if content is None:
+        return None, 0, 0.0
+    if season_cache is None:
+        season_cache = _worker_season_cache
+    start = time.perf_counter()
+    stats = {}
+    movie = parse_movie_data(content, file_path, full_path, stats, season_cache)
+    return movie, stats.get("malformed_lines", 0), time.perf_counter() - start
+
+def _load_sidecar(file_path, full_path, entry, season_cache):
+    st, content, read_seconds = _read_sidecar(file_path, entry)
+    parsed = _parse_content(content, file_path, full_path, season_cache)
+    return (st, content is not None, read_seconds) + parsed
+
+def _ordered_results(fn, jobs, executor=None, window=64):
+    """
+    Applies fn to each (key, args) job and yields (key, result, error)
+    in submission order. With an executor, at most `window` jobs are in flight.
+    """
+    if executor is None:
+        for key, args in jobs:
+            try:
+                yield key, fn(*args), None
+            except Exception as e:
+                yield key, None, e
+        return
+
+    pending = deque()
+
+    def pop():
+        key, future = pending.popleft()
+        try:
+            return key, future.result(), None
+        except Exception as e:
+            return key, None, e
+
+    for key, args in jobs:
+        pending.append((key, executor.submit(fn, *args)))
+        if len(pending) >= window:
+            yield pop()
+    while pending:
+        yield pop()
+
+def _iter_sidecar_records(root_dir, previous, workers=1, use_processes=False, metrics=None):
+    """
+    Yields (file_path, (stat, changed, read_seconds, record, malformed, parse_seconds), error)
+    for every sidecar in walk order. With workers > 1 file reads overlap in a thread pool, and with
+    use_processes=True parsing additionally runs in a process pool.
+    Season folders are resolved once per directory for the whole run.
+    """
+    season_cache = {}
+    jobs = (
+        ((file_path, full_path), (file_path, full_path, previous.get(file_path), season_cache))
+        for file_path, full_path in iter_sidecars(root_dir, metrics)
+    )
+
+    if workers <= 1:
+        for (file_path, _), result, error in _ordered_results(_load_sidecar, jobs):
+            yield file_path, result, error
+        return
+
+    window = workers * 4
+    with ThreadPoolExecutor(max_workers=workers) as readers:
+        if not use_processes:
+            for (file_path, _), result, error in _ordered_results(_load_sidecar, jobs, readers, window):
+                yield file_path, result, error
+            return
+
+        read_jobs = (
+            (key, (file_path, previous.get(file_path)))
+            for key, (file_path, _, _, _) in jobs
+        )
+        reads = _ordered_results(_read_sidecar, read_jobs, readers, window)
+        parse_jobs = (
+            ((file_path, result, error), (result[1] if result else None, file_path, full_path))
+            for (file_path, full_path), result, error in reads
+        )
+        with ProcessPoolExecutor(max_workers=workers) as parsers:
+            for (file_path, read, read_error), parsed, parse_error in _ordered_results(
+                _parse_content, parse_jobs, parsers, window
+            ):
+                if read_error or parse_error:
+                    yield file_path, None, read_error or parse_error
+                else:
+                    st, content, read_seconds = read
+                    yield file_path, (st, content is not None, read_seconds) + parsed, None
+
+def open_catalog_outputs(output_json_file, output_format="pretty", sqlite_file=None,
+                         shard_dir=None, shard_by="series", root_dir=None, search_index_file=None):
+    """
+    Opens every configured catalog writer. Returns (stack, outputs): each
+    record goes to every output's write(), and closing the ExitStack commits
+    all of them, or aborts them all if the block raised. The JSON
+    CatalogWriter is always outputs[0].
+    """
+    stack = ExitStack()
+    try:
+        outputs = [stack.enter_context(CatalogWriter(output_json_file, output_format))]
+        if sqlite_file:
+            outputs.append(stack.enter_context(SqliteCatalogWriter(sqlite_file)))
+        if search_index_file:
+            outputs.append(stack.enter_context(SearchIndexWriter(search_index_file)))
+        # The sharded writer stays last; callers report outputs[-1].changed
+        if shard_dir:
+            outputs.append(stack.enter_context(
+                ShardedCatalogWriter(shard_dir, shard_by, output_format, root_dir)
+            ))
+    except BaseException:
+        stack.__exit__(*sys.exc_info())
+        raise
+    return stack, outputs
+
+
+def add_catalog_output_arguments(parser):
+    """The --format/--sqlite/--shards/--shard-by/--search-index options for open_catalog_outputs()."""
+    parser.add_argument("--format", choices=CATALOG_FORMATS, default="pretty",
+                        help="catalog layout: indented JSON, compact JSON or JSON Lines")
+    parser.add_argument("--sqlite", default=None, metavar="FILE",
+                        help="also write an indexed SQLite catalog")
+    parser.add_argument("--shards", default=None, metavar="DIR",
+                        help="also write one catalog file per shard plus an index.json to DIR")
+    parser.add_argument("--shard-by", choices=SHARD_KEYS, default="series",
+                        help="shard by series id or by top-level folder")
+    parser.add_argument("--search-index", default=None, metavar="FILE",
+                        help="also keep a full-text and faceted search index in FILE")
+
+
+def text_files_to_json(root_dir, output_json_file, incremental=False, manifest_file=None,
+                       workers=1, use_processes=False, output_format="pretty", metrics=None,
+                       sqlite_file=None, shard_dir=None, shard_by="series", search_index_file=None):
     """
     Reads all text files in a root directory and its subdirectories,
     and converts their content into a single JSON file.
+
+    With incremental=True, a manifest (path -> mtime, size, parsed record)
+    is kept next to the output file and only new or changed sidecars are
+    re-parsed. workers > 1 overlaps sidecar reads in a thread pool, and
+    use_processes=True parses in a process pool as well; the output order
+    is the same either way.
+
+    Records are streamed to a temp file as they are parsed and renamed over
+    output_json_file at the end. output_format is "pretty" (indent=4, the
+    default), "compact" or "jsonl"; see catalog_writer.CatalogWriter.
+
+    With sqlite_file, the same records are also bulk-loaded into an indexed
+    SQLite catalog (see catalog_sqlite.SqliteCatalogWriter).
+
+    With shard_dir, the catalog is also written as one file per series
+    (shard_by="series") or per top-level folder ("folder") with an
+    index.json; only shards whose content changed are rewritten (see
+    catalog_shards.ShardedCatalogWriter).
+
+    With search_index_file, a full-text and faceted search index over the
+    records is kept up to date as well; only records whose indexed fields
+    changed are re-indexed (see search_index.SearchIndexWriter).
+
+    If an instrumentation.Metrics is given, walk/read/parse/write stage
+    timings and sidecar counters are recorded in it.
+
+    Returns a dict with added/updated/removed/unchanged counts, the number
+    of skipped malformed lines and the list of (file_path, message) errors
+    for sidecars that could not be read.
     """
-    data_list = []
+    if manifest_file is None:
+        manifest_file = manifest_path_for(output_json_file)
 
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        for filename in filenames:
-            if filename.endswith('.txt'):
-                file_path = os.path.join(dirpath, filename)
-                full_path = os.path.join(os.path.realpath(dirpath), filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        movie = parse_movie_data(content, file_path, full_path)
-                        if movie:
-                            data_list.append(movie)
-                except Exception as e:
-                    print(f"Error reading file {file_path}: {e}")
+    # Both manifests hold every record; keep them compact, sharing one string table
+    packer = RecordPacker()
+    previous = load_manifest(manifest_file, packer) if incremental else {}
+    current = {}
+    summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0,
+               "malformed_lines": 0, "errors": []}
 
     try:
-        with open(output_json_file, 'w', encoding='utf-8') as f:
-            json.dump(data_list, f, indent=4)
-        print(f"Successfully wrote data from {len(data_list)} files to {output_json_file}")
+        sinks, outputs = open_catalog_outputs(output_json_file, output_format, sqlite_file,
+                                              shard_dir, shard_by, root_dir, search_index_file)
     except Exception as e:
-        print(f"Error writing to JSON file {output_json_file}: {e}")
+        print(f"Error creating catalog output: {e}")
+        return summary
+    writer = outputs[0]
+
+    metrics = metrics or Metrics()
+    records = _iter_sidecar_records(root_dir, previous, workers, use_processes, metrics)
+    with sinks:
+        for file_path, result, error in records:
+            if error is not None:
+                summary["errors"].append((file_path, str(error)))
+                metrics.incr("sidecar_errors")
+                continue
+
+            st, changed, read_seconds, movie, malformed, parse_seconds = result
+            metrics.observe("read", read_seconds)
+            summary["malformed_lines"] += malformed
+            entry = previous.get(file_path)
+            if changed:
+                metrics.observe("parse", parse_seconds)
+                metrics.incr("sidecars_parsed")
+                summary["updated" if entry else "added"] += 1
+            else:
+                movie = entry["record"]
+                metrics.incr("sidecars_unchanged")
+                summary["unchanged"] += 1
+
+            if movie:
+                with metrics.timer("write"):
+                    record = record_dict(movie)
+                    for output in outputs:
+                        output.write(record)
+                if incremental:
+                    current[file_path] = {
+                        "mtime": st.st_mtime_ns,
+                        "size": st.st_size,
+                        "record": packer.pack(movie) if changed else movie
+                    }
+
+    summary["removed"] = len(previous.keys() - current.keys())
+    metrics.incr("sidecars_removed", summary["removed"])
+    metrics.incr("malformed_lines", summary["malformed_lines"])
+    if summary["errors"]:
+        print(f"Could not read {len(summary['errors'])} sidecar files")
+    if summary["malformed_lines"]:
+        print(f"Skipped {summary['malformed_lines']} malformed sidecar lines")
+    print(f"Successfully wrote data from {writer.count} files to {output_json_file}")
+    if sqlite_file:
+        print(f"Wrote SQLite catalog to {sqlite_file}")
+    if shard_dir:
+        print(f"Wrote shards to {shard_dir} ({len(outputs[-1].changed)} changed)")
+    if search_index_file:
+        print(f"Updated search index {search_index_file}")
+
+    if incremental:
+        try:
+            save_manifest(manifest_file, current)
+        except Exception as e:
+            print(f"Error writing manifest {manifest_file}: {e}")
+        print(
+            f"Added {summary['added']}, updated {summary['updated']}, "
+            f"removed {summary['removed']}, unchanged {summary['unchanged']}"
+        )
+
+    return summary
 
 if __name__ == "__main__":
-    input_directory = "../../TV Shows"  # Change to your source directory
-    output_file = "./tv_shows_data.json"  # Desired output JSON path
-    text_files_to_json(input_directory, output_file)
+    parser = argparse.ArgumentParser(description="Build a JSON catalog from .txt sidecar files.")
+    parser.add_argument("input_directory", nargs="?", default="../../TV Shows")
+    parser.add_argument("output_file", nargs="?", default="./tv_shows_data.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-parse sidecars that changed since the last run")
+    parser.add_argument("--manifest", default=None,
+                        help="manifest path (default: next to the output file)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of threads reading sidecars in parallel")
+    parser.add_argument("--processes", action="store_true",
+                        help="parse sidecars in a process pool of --workers processes")
+    add_catalog_output_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    with profile_option(args.profile):
+        text_files_to_json(args.input_directory, args.output_file,
+                           incremental=args.incremental, manifest_file=args.manifest,
+                           workers=args.workers, use_processes=args.processes,
+                           output_format=args.format, metrics=metrics,
+                           sqlite_file=args.sqlite, shard_dir=args.shards,
+                           shard_by=args.shard_by, search_index_file=args.search_index)
+    if args.metrics:
+        metrics.write(args.metrics)
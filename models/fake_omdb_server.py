@@ -0,0 +1,197 @@
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+POSTER_BYTES = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 64 + b"\xff\xd9"
+
+
+def _imdb_id(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(p).lower() for p in parts).encode()).hexdigest()
+    return "tt" + str(int(digest[:12], 16) % 10_000_000).zfill(7)
+
+
+class FakeOmdbServer:
+    """
+    Local stand-in for the OMDb API and its poster host, for benchmarks.
+
+    Answers title lookups (t=), season listings (i=&Season=) and episode
+    lookups (i=&Season=&Episode=) with deterministic records, and serves
+    /posters/<id>.jpg with an ETag that honours If-None-Match. Titles starting
+    with "Missing" are reported as not found. Every response is delayed by
+    `latency` seconds to mimic a remote API; request counts per kind are
+    kept in `requests`, the arrival times of API (non-poster) requests in
+    `api_times` and the most requests ever handled at once in `max_in_flight`.
+
+        with FakeOmdbServer(latency=0.02) as server:
+            client = OmdbClient("key", base_url=server.url)
+    """
+
+    def __init__(self, latency: float = 0.0, episodes_per_season: int = 10,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.episodes_per_season = episodes_per_season
+        self.requests = Counter()
+        self.api_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count(self, kind: str):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def _enter(self, is_api: bool):
+        with self._lock:
+            if is_api:
+                self.api_times.append(time.monotonic())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # ------------------- Responses -------------------
+
+    def _title(self, params: dict) -> dict:
+        title = params["t"]
+        if title.lower().startswith("missing"):
+            return {"Response": "False", "Error": "Movie not found!"}
+        kind = params.get("type", "movie")
+        imdb_id = _imdb_id(kind, title)
+        return {
+            "Response": "True",
+            "Title": title,
+            "Year": "2019",
+            "Rated": "TV-MA",
+            "Genre": "Drama, History",
+            "Director": "N/A" if kind == "series" else "Jane Director",
+            "Writer": "John Writer",
+            "Actors": "Actor One, Actor Two, Actor Three",
+            "Plot": f"Plot of {title}.",
+            "Poster": f"{self.url}posters/{imdb_id}.jpg",
+            "imdbRating": "8.1",
+            "imdbID": imdb_id,
+            "Type": kind
+        }
+
+    def _season(self, params: dict) -> dict:
+        season = int(params["Season"])
+        return {
+            "Response": "True",
+            "Title": "Series " + params["i"],
+            "Season": str(season),
+            "totalSeasons": "10",
+            "Episodes": [
+                {
+                    "Title": f"Episode {episode}",
+                    "Released": "2019-05-06",
+                    "Episode": str(episode),
+                    "imdbRating": "8.5",
+                    "imdbID": _imdb_id(params["i"], season, episode)
+                }
+                for episode in range(1, self.episodes_per_season + 1)
+            ]
+        }
+
+    def _episode(self, params: dict) -> dict:
+        season, episode = int(params["Season"]), int(params["Episode"])
+        if episode > self.episodes_per_season:
+            return {"Response": "False", "Error": "Series or episode not found!"}
+        return {
+            "Response": "True",
+            "Title": f"Episode {episode}",
+            "Year": "2019",
+            "Rated": "TV-MA",
+            "Season": str(season),
+            "Episode": str(episode),
+            "Genre": "Drama, History",
+            "Director": "Jane Director",
+            "Writer": "John Writer",
+            "Actors": "Actor One, Actor Two",
+            "Plot": f"Plot of episode {episode}.",
+            "Poster": f"{self.url}posters/{params['i']}.jpg",
+            "imdbRating": "8.5",
+            "imdbID": _imdb_id(params["i"], season, episode),
+            "seriesID": params["i"],
+            "Type": "episode"
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", headers: dict = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                server._enter(not parts.path.startswith("/posters/"))
+                try:
+                    self._respond(parts)
+                finally:
+                    server._leave()
+
+            def _respond(self, parts):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if parts.path.startswith("/posters/"):
+                    etag = '"' + hashlib.md5(POSTER_BYTES).hexdigest() + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        server.count("poster_not_modified")
+                        self._send(304, headers={"ETag": etag})
+                    else:
+                        server.count("poster")
+                        self._send(200, POSTER_BYTES, {"Content-Type": "image/jpeg", "ETag": etag})
+                    return
+
+                params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                if "t" in params:
+                    kind, data = "title", server._title(params)
+                elif "Season" in params and "Episode" in params:
+                    kind, data = "episode", server._episode(params)
+                elif "Season" in params:
+                    kind, data = "season", server._season(params)
+                else:
+                    kind, data = "other", {"Response": "False", "Error": "Incorrect IMDb ID."}
+                server.count(kind)
+                self._send(200, json.dumps(data).encode(), {"Content-Type": "application/json"})
+
+        return Handler
@@ -0,0 +1,118 @@
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+
+class ParsedName(NamedTuple):
+    title: Optional[str]
+    season: Optional[int]
+    episodes: Tuple[int, ...]
+    year: Optional[int]
+
+
+class FilenameParser:
+    """
+    Extracts the title, season and episode(s) from a media filename.
+
+    Handles "Show S01E02", multi-episode "Show S01E01E02" (or S01E01-E02),
+    "Show 1x02", "Movie 2019" and "Movie (2019)", ignoring release tags
+    such as 1080p or BluRay. One combined regex scans each name once, and
+    results are memoized per basename since the same files are parsed
+    repeatedly (for grouping, then for processing).
+    """
+    # Release tags, episode markers and years in a single alternation, matched left to right.
+    # The lookahead lets the scan skip positions where no alternative can start.
+    TOKEN_PATTERN = re.compile(
+        r"(?=[\dSUBHAWD(])(?:"
+        r"\b(?P<tag>UHD|1080p|2160p|Blu[- ]?ray|HEVC|HDR|Atmos|WEB|DVDRip|H264|H265)\b"
+        r"|S(?P<season>\d{2})E(?P<episodes>\d{2}(?:-?E\d{2})*)"
+        r"|\b(?P<xseason>\d{1,2})x(?P<xepisode>\d{2})\b"
+        r"|\((?P<pyear>(?:19|20)\d{2})\)"
+        r"|\b(?P<year>(?:19|20)\d{2})\b"
+        r")",
+        re.IGNORECASE
+    )
+    EPISODE_NUMBER = re.compile(r"\d{2}")
+
+    VALID_EXTENSIONS = {".mkv", ".mp4", ".m4v", ".avi", ".mov", ".webm", ".flv", ".wmv", ".mpg"}
+
+    CACHE_SIZE = 65536
+
+    @staticmethod
+    def parse(filepath: str) -> Tuple[str, Optional[int], Optional[int]]:
+        """Returns (title, season, first episode); (None, None, None) for non-media files."""
+        title, season, episodes, _ = _parse_basename(os.path.basename(filepath))
+        return title, season, episodes[0] if episodes else None # type: ignore
+
+    @staticmethod
+    def parse_info(filepath: str) -> ParsedName:
+        """Like parse(), but with every episode of a multi-episode file and the year."""
+        return _parse_basename(os.path.basename(filepath))
+
+    @staticmethod
+    def parse_many(paths) -> list:
+        """parse() for an iterable of paths, returned as a list in the same order."""
+        basename = os.path.basename
+        results = []
+        for path in paths:
+            title, season, episodes, _ = _parse_basename(basename(path))
+            results.append((title, season, episodes[0] if episodes else None))
+        return results
+
+
+_NOT_MEDIA = ParsedName(None, None, (), None)
+
+
+@lru_cache(maxsize=FilenameParser.CACHE_SIZE)
+def _parse_basename(basename: str) -> ParsedName:
+    name, ext = os.path.splitext(basename)
+
+    # Ensure the file has a valid extension
+    if ext.lower() not in FilenameParser.VALID_EXTENSIONS:
+        return _NOT_MEDIA
+
+    dotted = name
+    name = name.replace(".", " ")
+
+    # Text kept so far is "".join(kept) + name[position:match.start()]; release tags are dropped
+    kept = []
+    position = 0
+    movie_title = year = None
+    for match in FilenameParser.TOKEN_PATTERN.finditer(name):
+        kind = match.lastgroup
+        if kind == "tag":
+            kept.append(name[position:match.start()])
+            position = match.end()
+            continue
+
+        if kind == "episodes":
+            title = ("".join(kept) + name[position:match.start()]).strip()
+            episodes = tuple(int(n) for n in FilenameParser.EPISODE_NUMBER.findall(match.group(kind)))
+            return ParsedName(title, int(match.group("season")), episodes, year)
+        if kind == "xepisode":
+            # "5.1x26..." / "AAC2.0x2..." are audio and codec tags, not season x episode
+            start = match.start()
+            if start >= 2 and dotted[start - 1] == "." and dotted[start - 2].isdigit():
+                continue
+            title = ("".join(kept) + name[position:match.start()]).strip()
+            # A bare "10x10" with nothing before it is a title, not an untitled episode
+            if not title:
+                continue
+            return ParsedName(title, int(match.group("xseason")), (int(match.group(kind)),), year)
+
+        # The first year with some title before it ends a movie title, unless an episode marker follows
+        if movie_title is None:
+            prefix = ("".join(kept) + name[position:match.start()]).strip()
+            if prefix:
+                movie_title, year = prefix, int(match.group(kind))
+
+    if movie_title is not None:
+        return ParsedName(movie_title, None, (), year)
+
+    # Default return if no pattern matches
+    return ParsedName(("".join(kept) + name[position:]).strip(), None, (), None)
+
+
+def is_media_file(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in FilenameParser.VALID_EXTENSIONS
@@ -1,27 +1,83 @@
 import os
-import re
+import time
+import shutil
+import hashlib
+import argparse
+import threading
 import requests
-from typing import Optional, Tuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+from http_session import HttpSession
+from catalog_writer import make_temp_file
+from filename_parser import FilenameParser, is_media_file
+from json_state import file_sha256, load_json_state, save_json_state
+from omdb_cache import OmdbResponseCache
+from media_probe import MediaProber, probe_lines
+from poster_derivatives import DerivativeGenerator, apply_derivatives
+from media_versions import group_versions, refresh_version_lines, secondary_paths
+from instrumentation import Metrics, add_instrumentation_arguments, profile_option
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most `rate` per second apart."""
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("Rate limit must be positive")
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
 
 
 class OmdbClient:
     BASE_URL = "https://www.omdbapi.com/"
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, rate_limiter: Optional[RateLimiter] = None,
+                 base_url: Optional[str] = None, cache=None,
+                 session: Optional[HttpSession] = None, metrics: Optional[Metrics] = None):
         if not api_key:
             raise ValueError("OMDb API key is required")
         self.api_key = api_key
+        self.session = session or HttpSession()
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url or self.BASE_URL
+        self.cache = cache
+        self.metrics = metrics or Metrics()
 
     def _request(self, params: dict) -> Optional[dict]:
+        if self.cache:
+            cached = self.cache.get(params)
+            if cached is not None:
+                self.metrics.incr("api_cache_hits")
+                return cached if cached.get("Response") == "True" else None
+
         params["apikey"] = self.api_key
+        if self.rate_limiter:
+            with self.metrics.timer("rate_limit_wait"):
+                self.rate_limiter.wait()
+        self.metrics.incr("api_requests")
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            with self.metrics.timer("api_request"):
+                response = self.session.get(self.base_url, params=params)
             response.raise_for_status()
         except requests.RequestException as e:
+            self.metrics.incr("api_errors")
             print(f"Error during API request: {e}")
             return None
 
         data = response.json()
+        if self.cache:
+            self.cache.set(params, data)
         return data if data.get("Response") == "True" else None
 
     def get_movie_or_series(self, title: str, is_series: bool) -> Optional[dict]:
@@ -37,151 +93,513 @@ class OmdbClient:
             "Episode": episode
         })
 
+    def get_season(self, series_imdb_id: str, season: int) -> Optional[dict]:
+        return self._request({
+            "i": series_imdb_id,
+            "Season": season
+        })
 
-class FilenameParser:
-    CLEANUP_PATTERN = re.compile(
-        r'\b(UHD|1080p|2160p|Blu[- ]?ray|HEVC|HDR|Atmos|WEB|DVDRip|H264|H265)\b',
-        re.IGNORECASE
-    )
-
-    TV_PATTERN = re.compile(r"(.*?)\s*S(\d{2})E(\d{2})", re.IGNORECASE)
-    MOVIE_PATTERN = re.compile(r"(.+?)\b(19|20)\d{2}\b", re.IGNORECASE)
-
-    VALID_EXTENSIONS = {".mkv", ".mp4", ".m4v", ".avi", ".mov", ".webm", ".flv", ".wmv", ".mpg"}
-
-    @staticmethod
-    def parse(filepath: str) -> Tuple[str, Optional[int], Optional[int]]:
-        name, ext = os.path.splitext(os.path.basename(filepath))
-
-        # Ensure the file has a valid extension
-        if ext.lower() not in FilenameParser.VALID_EXTENSIONS:
-            return None, None, None # type: ignore
-
-        name = name.replace(".", " ")
-        name = FilenameParser.CLEANUP_PATTERN.sub("", name).strip()
-
-        # Check if it's a TV show
-        tv_match = FilenameParser.TV_PATTERN.search(name)
-        if tv_match:
-            return tv_match.group(1).strip(), int(tv_match.group(2)), int(tv_match.group(3))
-
-        # Check if it's a movie
-        movie_match = FilenameParser.MOVIE_PATTERN.match(name)
-        if movie_match:
-            return movie_match.group(1).strip(), None, None
 
-        # Default return if no pattern matches
-        return name.strip(), None, None
+def _copy_atomic(src: str, dst: str):
+    fd, tmp_path = make_temp_file(dst)
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
 
 class PosterDownloader:
-    @staticmethod
-    def download(movie_data: dict, media_path: str) -> str:
+    """
+    Downloads posters next to the media as <media>.jpg.
+
+    Posters are streamed in chunks to a temp file and renamed into place.
+    For every URL the ETag, Last-Modified and content hash are remembered
+    (persisted to state_file if given), so unchanged posters are revalidated
+    with a conditional request and come back as 304s. A URL is fetched at
+    most once per run: other files sharing the same poster, such as the
+    episodes of a series, get a local copy of the already downloaded image.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, session: Optional[HttpSession] = None, state_file: Optional[str] = None,
+                 metrics: Optional[Metrics] = None):
+        self.session = session or HttpSession()
+        self.state_file = state_file
+        self.metrics = metrics or Metrics()
+        self._state = load_json_state(state_file, "poster state")
+        self._fetched = set()
+        self._url_locks = {}
+        self._lock = threading.Lock()
+
+    def save_state(self):
+        with self._lock:
+            save_json_state(self.state_file, self._state)
+
+    def download(self, movie_data: dict, media_path: str) -> str:
         poster_url = movie_data.get("Poster")
         if not poster_url or poster_url == "N/A":
             return ""
 
         # Use the media's directory and filename for poster saving
         image_path = media_path + ".jpg"
-        try:
-            response = requests.get(poster_url, timeout=10)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"Error downloading poster: {e}")
-            return ""
 
-        with open(image_path, "wb") as f:
-            f.write(response.content)
+        with self._lock:
+            url_lock = self._url_locks.setdefault(poster_url, threading.Lock())
+        with url_lock:
+            try:
+                return self._download(poster_url, image_path)
+            except (requests.RequestException, OSError) as e:
+                self.metrics.incr("poster_errors")
+                print(f"Error downloading poster: {e}")
+                return ""
+
+    def _download(self, poster_url: str, image_path: str) -> str:
+        entry = self._state.get(poster_url)
+        current_hash = file_sha256(image_path) if entry else None
+
+        if entry and poster_url in self._fetched:
+            if current_hash != entry["sha256"]:
+                _copy_atomic(entry["path"], image_path)
+            self.metrics.incr("posters_reused")
+            return image_path
+
+        # Revalidate only if some local file still holds the remembered content
+        source = None
+        if entry:
+            if current_hash == entry["sha256"]:
+                source = image_path
+            elif file_sha256(entry["path"]) == entry["sha256"]:
+                source = entry["path"]
+
+        headers = {}
+        if source:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self.session.get(poster_url, headers=headers, stream=True) as response:
+            if response.status_code == 304 and source:
+                if source != image_path:
+                    _copy_atomic(source, image_path)
+                sha256 = entry["sha256"]
+                self.metrics.incr("posters_not_modified")
+            else:
+                response.raise_for_status()
+                if response.status_code == 304:
+                    raise requests.HTTPError(f"Unexpected 304 for {poster_url}", response=response)
+                sha256 = self._stream_to(response, image_path, current_hash)
+                self.metrics.incr("posters_downloaded")
+                entry = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+
+        entry["sha256"] = sha256
+        entry["path"] = image_path
+        with self._lock:
+            self._state[poster_url] = entry
+            self._fetched.add(poster_url)
         return image_path
 
+    def _stream_to(self, response: requests.Response, image_path: str,
+                   current_hash: Optional[str]) -> str:
+        """Streams the body to a temp file; replaces image_path only if the content differs."""
+        digest = hashlib.sha256()
+        fd, tmp_path = make_temp_file(image_path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+            if digest.hexdigest() == current_hash:
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, image_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest.hexdigest()
+
 
 class MetadataWriter:
     @staticmethod
-    def write(movie_data: dict, media_path: str, image_path: str):
-        # Generate the txt filename in the same directory as the original media
-        txt_path = media_path + ".txt"
+    def render(movie_data: dict, image_path: str, probe: Optional[dict] = None,
+               version_lines: Optional[list] = None) -> str:
+        """
+        Returns the .txt sidecar text for an OMDb record and, if given, a
+        media_probe result and media_versions lines for the other versions.
+        """
         is_episode = movie_data.get("Type") == "episode"
 
         series_id = movie_data.get("seriesID") or movie_data.get("imdbID")
 
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(f"title : {movie_data.get('Title')}\n")
-            f.write(f"movieYear : {movie_data.get('Year')}\n")
-            f.write(f"programId : {series_id}\n")
-            f.write(f"seriesId : {series_id}\n")
-
-            if is_episode:
-                f.write(f"episodeId : {movie_data.get('imdbID')}\n")
-
-            f.write(f"description : {movie_data.get('Plot')}\n")
-            f.write(f"isEpisode : {'true' if is_episode else 'false'}\n")
-            f.write(
-                f"isEpisodic : {'true' if movie_data.get('Type') in ('series', 'episode') else 'false'}\n"
-            )
+        lines = [
+            f"title : {movie_data.get('Title')}\n",
+            f"movieYear : {movie_data.get('Year')}\n",
+            f"programId : {series_id}\n",
+            f"seriesId : {series_id}\n",
+        ]
+
+        if is_episode:
+            lines.append(f"episodeId : {movie_data.get('imdbID')}\n")
+
+        lines.append(f"description : {movie_data.get('Plot')}\n")
+        lines.append(f"isEpisode : {'true' if is_episode else 'false'}\n")
+        lines.append(
+            f"isEpisodic : {'true' if movie_data.get('Type') in ('series', 'episode') else 'false'}\n"
+        )
+
+        for genre in movie_data.get("Genre", "").split(", "):
+            if genre:
+                lines.append(f"vProgramGenre : {genre}\n")
+
+        for director in movie_data.get("Director", "").split(", "):
+            if director:
+                lines.append(f"vDirector : {director}\n")
+
+        for writer in movie_data.get("Writer", "").split(", "):
+            if writer:
+                lines.append(f"vWriter : {writer}\n")
+
+        for actor in movie_data.get("Actors", "").split(", "):
+            if actor:
+                lines.append(f"vActor : {actor}\n")
+
+        lines.append(f"mpaaRating : {movie_data.get('Rated', 'N/A')}\n")
+        lines.append(f"starRating : {movie_data.get('imdbRating', 'N/A')}\n")
+        lines.append(f"image : {os.path.basename(image_path) if image_path else 'N/A'}\n")
+        lines.extend(probe_lines(probe))
+        lines.extend(version_lines or ())
+        return "".join(lines)
 
-            for genre in movie_data.get("Genre", "").split(", "):
-                if genre:
-                    f.write(f"vProgramGenre : {genre}\n")
-
-            for director in movie_data.get("Director", "").split(", "):
-                if director:
-                    f.write(f"vDirector : {director}\n")
-
-            for writer in movie_data.get("Writer", "").split(", "):
-                if writer:
-                    f.write(f"vWriter : {writer}\n")
-
-            for actor in movie_data.get("Actors", "").split(", "):
-                if actor:
-                    f.write(f"vActor : {actor}\n")
-
-            f.write(f"mpaaRating : {movie_data.get('Rated', 'N/A')}\n")
-            f.write(f"starRating : {movie_data.get('imdbRating', 'N/A')}\n")
-            f.write(f"image : {os.path.basename(image_path) if image_path else 'N/A'}\n")
+    @staticmethod
+    def write(movie_data: dict, media_path: str, image_path: str, probe: Optional[dict] = None,
+              version_lines: Optional[list] = None) -> str:
+        """Writes the sidecar next to the media file and returns its text."""
+        # Generate the txt filename in the same directory as the original media
+        txt_path = media_path + ".txt"
+        text = MetadataWriter.render(movie_data, image_path, probe, version_lines)
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return text
 
 
 class MediaProcessor:
-    def __init__(self, omdb_client: OmdbClient):
+    """
+    Looks up, downloads and writes metadata for single media files.
+
+    Series and season lookups are memoized for the lifetime of the processor,
+    so a folder of episodes costs one series lookup, then one request per
+    episode for its full record.
+
+    With listing_episodes=True, episodes are instead built from one season
+    listing per season merged with the series record, saving a request per
+    episode. The listing has no per-episode plot, credits or poster, so those
+    are the series' values. Episodes missing from the listing fall back to
+    get_episode.
+    """
+
+    def __init__(self, omdb_client: OmdbClient, listing_episodes: bool = False,
+                 poster_downloader: Optional[PosterDownloader] = None):
         self.omdb = omdb_client
+        self.metrics = omdb_client.metrics
+        self.posters = poster_downloader or PosterDownloader(omdb_client.session, metrics=self.metrics)
+        self.listing_episodes = listing_episodes
+        self._memo = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _memoized(self, key: tuple, fetch):
+        """Returns the memoized value for key, calling fetch() once per key even across threads."""
+        with self._lock:
+            if key in self._memo:
+                self.metrics.incr("memo_hits")
+                return self._memo[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._memo:
+                    self.metrics.incr("memo_hits")
+                    return self._memo[key]
+            value = fetch()
+            with self._lock:
+                self._memo[key] = value
+                del self._key_locks[key]
+        return value
+
+    def lookup_title(self, title: str, is_series: bool) -> Optional[dict]:
+        return self._memoized(
+            ("title", title.lower(), is_series),
+            lambda: self.omdb.get_movie_or_series(title, is_series)
+        )
+
+    def season_episodes(self, series_imdb_id: str, season: int) -> dict:
+        """Returns {episode number: season listing entry} for one season."""
+        def fetch():
+            data = self.omdb.get_season(series_imdb_id, season) or {}
+            episodes = {}
+            for entry in data.get("Episodes", []):
+                try:
+                    episodes[int(entry["Episode"])] = entry
+                except (KeyError, ValueError):
+                    continue
+            return episodes
+
+        return self._memoized(("season", series_imdb_id, season), fetch)
 
-    def process(self, media_path: str):
+    @staticmethod
+    def _episode_from_listing(series_data: dict, entry: dict, season: int) -> dict:
+        episode_data = dict(series_data)
+        episode_data.update({
+            "Title": entry.get("Title"),
+            "imdbID": entry["imdbID"],
+            "imdbRating": entry.get("imdbRating", "N/A"),
+            "Season": str(season),
+            "Episode": entry.get("Episode"),
+            "Type": "episode",
+            "seriesID": series_data["imdbID"]
+        })
+        released = entry.get("Released", "")
+        if released[:4].isdigit():
+            episode_data["Year"] = released[:4]
+        return episode_data
+
+    def get_episode(self, series_data: dict, season: int, episode: int) -> Optional[dict]:
+        if self.listing_episodes:
+            entry = self.season_episodes(series_data["imdbID"], season).get(episode)
+            if entry and entry.get("imdbID", "N/A") != "N/A":
+                return self._episode_from_listing(series_data, entry, season)
+        return self.omdb.get_episode(series_data["imdbID"], season, episode)
+
+    def process(self, media_path: str, probe: Optional[dict] = None,
+                version_lines: Optional[list] = None) -> Optional[str]:
+        """
+        Tags one media file; returns the sidecar text written, or None if
+        nothing was found. A media_probe result and the lines listing the
+        file's other versions are written into the sidecar too.
+        """
         title, season, episode = FilenameParser.parse(media_path)
         if title is None:
+            self.metrics.incr("skipped_unsupported")
             print(f"Skipping unsupported file: {media_path}")
             return
 
         is_tv = season is not None and episode is not None
 
-        base_data = self.omdb.get_movie_or_series(title, is_tv)
+        with self.metrics.timer("lookup"):
+            base_data = self.lookup_title(title, is_tv)
         if not base_data:
+            self.metrics.incr("metadata_not_found")
             print(f"Metadata not found for {title}")
             return
 
         if is_tv:
-            episode_data = self.omdb.get_episode(base_data["imdbID"], season, episode) # type: ignore
+            with self.metrics.timer("episode_fetch"):
+                episode_data = self.get_episode(base_data, season, episode) # type: ignore
             if not episode_data:
+                self.metrics.incr("metadata_not_found")
                 print("Episode metadata not found")
                 return
             movie_data = episode_data
         else:
             movie_data = base_data
 
-        image_path = PosterDownloader.download(movie_data, media_path)
-        MetadataWriter.write(movie_data, media_path, image_path)
+        with self.metrics.timer("poster"):
+            image_path = self.posters.download(movie_data, media_path)
+        with self.metrics.timer("sidecar_write"):
+            text = MetadataWriter.write(movie_data, media_path, image_path, probe, version_lines)
 
+        self.metrics.incr("files_processed")
         print(f"Processed: {media_path}")
+        return text
+
+
+def _group_key(media_path: str) -> tuple:
+    """Sort key that keeps files of the same series and season next to each other."""
+    title, season, episode = FilenameParser.parse(media_path)
+    return (title or "").lower(), season or 0, episode or 0, media_path
 
 
 # ------------------- Batch Folder Processor -------------------
 
-def process_folder(directory: str, omdb_api_key: str):
-    processor = MediaProcessor(OmdbClient(omdb_api_key))
+def needs_metadata(media_path: str, refresh_older_than: Optional[float] = None,
+                   now: Optional[float] = None) -> bool:
+    """
+    True unless the media file already has a .txt sidecar newer than itself.
+    With refresh_older_than (seconds), sidecars older than that are stale too.
+    """
+    try:
+        sidecar_mtime = os.stat(media_path + ".txt").st_mtime
+        media_mtime = os.stat(media_path).st_mtime
+    except FileNotFoundError:
+        return True
+    return sidecar_is_stale(media_mtime, sidecar_mtime, refresh_older_than, now)
+
+
+def sidecar_is_stale(media_mtime: float, sidecar_mtime: Optional[float],
+                     refresh_older_than: Optional[float] = None, now: Optional[float] = None) -> bool:
+    """needs_metadata() for callers that already have both mtimes (None for a missing sidecar)."""
+    if sidecar_mtime is None or sidecar_mtime < media_mtime:
+        return True
+    if refresh_older_than is not None:
+        return (now or time.time()) - sidecar_mtime > refresh_older_than
+    return False
+
+
+@contextmanager
+def open_processor(omdb_api_key: str, concurrency: int = 1, rate_limit: Optional[float] = None,
+                   base_url: Optional[str] = None, cache_file: Optional[str] = None,
+                   listing_episodes: bool = False, session: Optional[HttpSession] = None,
+                   poster_state_file: Optional[str] = None, metrics: Optional[Metrics] = None):
+    """
+    Yields a MediaProcessor wired to a rate limiter, response cache, shared
+    session and poster downloader as described in process_folder(), and
+    saves the poster state and closes what it opened on exit.
+    """
+    metrics = metrics or Metrics()
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+    cache = OmdbResponseCache(cache_file) if cache_file else None
+    owns_session = session is None
+    if owns_session:
+        session = HttpSession(pool_size=max(concurrency, 10))
+    posters = PosterDownloader(session, poster_state_file, metrics)
+    processor = MediaProcessor(
+        OmdbClient(omdb_api_key, rate_limiter, base_url, cache, session, metrics), listing_episodes, posters
+    )
+    try:
+        yield processor
+    finally:
+        posters.save_state()
+        if cache:
+            cache.close()
+        if owns_session:
+            session.close()
+
+
+def process_folder(directory: str, omdb_api_key: str, concurrency: int = 1,
+                   rate_limit: Optional[float] = None, base_url: Optional[str] = None,
+                   cache_file: Optional[str] = None, listing_episodes: bool = False,
+                   session: Optional[HttpSession] = None, skip_current: bool = False,
+                   refresh_older_than: Optional[float] = None,
+                   poster_state_file: Optional[str] = None, metrics: Optional[Metrics] = None,
+                   prober: Optional[MediaProber] = None,
+                   derivatives: Optional[DerivativeGenerator] = None, detect_versions: bool = False):
+    """
+    Tags every media file under directory. Up to `concurrency` files are
+    processed at once, and OMDb requests are limited to `rate_limit` per
+    second across all workers. With cache_file, OMDb responses are kept in
+    an on-disk cache and reused by later runs.
+
+    Files are grouped by (series, season), so with listing_episodes each
+    season is resolved from a single listing request; see MediaProcessor.
+
+    OMDb and poster requests share one keep-alive session with retries,
+    sized to the concurrency unless a session is passed in. poster_state_file
+    keeps poster validators between runs so unchanged posters are not
+    downloaded again.
+
+    Only files with a media extension are processed. With skip_current,
+    files whose sidecar is newer than the media (and, with
+    refresh_older_than, younger than that many seconds) are left alone.
+
+    With a media_probe.MediaProber, the files are probed in a process pool
+    first and duration, codecs and direct-play support go into the sidecars.
+    With a poster_derivatives.DerivativeGenerator, the downloaded posters
+    are resized into thumbnails that the sidecars point at.
+
+    With detect_versions, files holding the same title or episode (say an
+    .mkv and its Plex optimized .mp4) are grouped and fingerprinted (see
+    media_versions). Only one file per group is looked up and tagged; its
+    sidecar lists the other versions, exact duplicates and the best
+    direct-play file.
+
+    Stage timings and counters are recorded in metrics, if given.
+    """
+    metrics = metrics or Metrics()
 
     # Recursively walk through the folder
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            processor.process(file_path)
+    media = []
+    with metrics.timer("walk"):
+        for root, dirs, files in os.walk(directory):
+            media.extend(os.path.join(root, file) for file in files if is_media_file(file))
+
+    groups = group_versions(media, metrics) if detect_versions else {}
+    if groups:
+        secondary = secondary_paths(groups)
+        media = [file_path for file_path in media if file_path not in secondary]
+        metrics.incr("versions_not_tagged", len(secondary))
+
+    paths = []
+    current = []
+    now = time.time()
+    for file_path in media:
+        if skip_current and not needs_metadata(file_path, refresh_older_than, now):
+            current.append(file_path)
+        else:
+            paths.append(file_path)
+    metrics.incr("skipped_current", len(current))
+    if current:
+        print(f"Skipped {len(current)} files with current metadata")
+
+    with open_processor(omdb_api_key, concurrency, rate_limit, base_url, cache_file, listing_episodes,
+                        session, poster_state_file, metrics) as processor:
+        probes = None
+        if prober is not None:
+            try:
+                probes = prober.probe_many(paths + sorted(secondary_paths(groups)))
+            finally:
+                prober.save_cache()
+        version_lines = {path: groups[path].sidecar_lines(probes) for path in paths if path in groups}
+        texts = process_paths(processor, paths, concurrency, probes, version_lines)
+        if derivatives is not None:
+            apply_derivatives(derivatives, texts)
+        refresh_version_lines(groups, current, probes)
+
+
+def process_paths(processor: MediaProcessor, paths: list, concurrency: int = 1,
+                  probes: Optional[dict] = None, version_lines: Optional[dict] = None) -> dict:
+    """
+    Processes paths with up to `concurrency` threads, in (series, season)
+    order; returns {path: sidecar text} for the files that were tagged.
+    probes and version_lines map paths to media_probe results and
+    media_versions sidecar lines for their sidecars.
+    Errors in concurrent runs are reported and counted.
+    """
+    paths = sorted(paths, key=_group_key)
+    probes = probes or {}
+    version_lines = version_lines or {}
+    results = {}
+    if concurrency <= 1:
+        for file_path in paths:
+            text = processor.process(file_path, probes.get(file_path), version_lines.get(file_path))
+            if text is not None:
+                results[file_path] = text
+        return results
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(
+                processor.process, file_path, probes.get(file_path), version_lines.get(file_path)
+            ): file_path
+            for file_path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                text = future.result()
+            except Exception as e:
+                processor.metrics.incr("process_errors")
+                print(f"Error processing {futures[future]}: {e}")
+                continue
+            if text is not None:
+                results[futures[future]] = text
+    return results
 
 
 # ------------------- USAGE -------------------
@@ -190,4 +608,47 @@ if __name__ == "__main__":
     OMDB_API_KEY = '34aef2c3'
     TARGET_DIRECTORY = r"D:\videos\TV Shows\Chernobyl"
 
-    process_folder(TARGET_DIRECTORY, OMDB_API_KEY)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tag media files with OMDb metadata and posters.")
+    parser.add_argument("directory", nargs="?", default=TARGET_DIRECTORY)
+    parser.add_argument("--api-key", default=os.environ.get("OMDB_API_KEY", OMDB_API_KEY))
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of files processed in parallel")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="maximum OMDb requests per second")
+    parser.add_argument("--cache-file", default=None,
+                        help="SQLite file caching OMDb responses between runs")
+    parser.add_argument("--listing-episodes", action="store_true",
+                        help="build episodes from the season listing: fewer requests, but series-level "
+                             "plot, credits and poster")
+    parser.add_argument("--skip-current", action="store_true",
+                        help="skip media whose .txt sidecar is newer than the media file")
+    parser.add_argument("--refresh-older-than", type=float, default=None, metavar="DAYS",
+                        help="with --skip-current, still refresh sidecars older than DAYS")
+    parser.add_argument("--poster-state", default=None,
+                        help="JSON file remembering poster ETags/hashes between runs")
+    parser.add_argument("--probe", action="store_true",
+                        help="record duration, codecs and direct-play support (uses ffprobe if installed)")
+    parser.add_argument("--probe-cache", default=None,
+                        help="JSON file caching probe results by path, mtime and size")
+    parser.add_argument("--thumbnails", action="store_true",
+                        help="create 150/300/600 px poster thumbnails (needs Pillow)")
+    parser.add_argument("--thumbnail-state", default=None,
+                        help="JSON file remembering poster hashes so unchanged posters are skipped")
+    parser.add_argument("--versions", action="store_true",
+                        help="tag each title once and list its other versions and duplicates")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    refresh_older_than = args.refresh_older_than * 86400 if args.refresh_older_than is not None else None
+
+    metrics = Metrics()
+    prober = MediaProber(args.probe_cache, metrics=metrics) if args.probe else None
+    derivatives = DerivativeGenerator(args.thumbnail_state, metrics=metrics) if args.thumbnails else None
+    with profile_option(args.profile):
+        process_folder(args.directory, args.api_key, concurrency=args.concurrency,
+                       rate_limit=args.rate_limit, cache_file=args.cache_file,
+                       listing_episodes=args.listing_episodes, skip_current=args.skip_current,
+                       refresh_older_than=refresh_older_than, poster_state_file=args.poster_state,
+                       metrics=metrics, prober=prober, derivatives=derivatives,
+                       detect_versions=args.versions)
+    if args.metrics:
+        metrics.write(args.metrics)
@@ -0,0 +1,53 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
+from typing import Optional
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpSession:
+    """
+    Keep-alive HTTP session shared by the OMDb client and poster downloader.
+
+    Connections are pooled per host (pool_size per pool), GETs that fail
+    with a connection error or a 429/5xx status are retried up to `retries`
+    times with exponential backoff plus random jitter (honouring Retry-After),
+    and each request gets the timeout configured for its host.
+    """
+
+    def __init__(self, pool_size: int = 10, retries: int = 3, backoff_factor: float = 0.5,
+                 backoff_jitter: float = 0.5, timeout: float = 10,
+                 host_timeouts: Optional[dict] = None):
+        self.timeout = timeout
+        self.host_timeouts = host_timeouts or {}
+
+        retry_options = dict(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        try:
+            retry = Retry(backoff_jitter=backoff_jitter, **retry_options)
+        except TypeError:
+            # urllib3 < 2 has no jitter option
+            retry = Retry(**retry_options)
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def timeout_for(self, url: str) -> float:
+        return self.host_timeouts.get(urlsplit(url).hostname, self.timeout)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout_for(url))
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
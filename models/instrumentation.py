@@ -0,0 +1,132 @@
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+
+class Metrics:
+    """
+    Thread-safe per-stage timers and counters for the indexing and
+    enrichment scripts.
+
+        metrics = Metrics()
+        with metrics.timer("parse"):
+            ...
+        metrics.incr("api_errors")
+        metrics.write("run.prom")  # or run.json
+
+    Timers keep a call count, total and maximum per stage. summary() returns
+    a JSON-friendly dict, to_prometheus() the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timers = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            timer = self.timers.get(stage)
+            if timer is None:
+                self.timers[stage] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {
+                    stage: {
+                        "count": count,
+                        "total_s": round(total, 6),
+                        "mean_ms": round(total / count * 1000, 4),
+                        "max_ms": round(maximum * 1000, 4),
+                    }
+                    for stage, (count, total, maximum) in self.timers.items()
+                },
+            }
+
+    def to_prometheus(self, prefix: str = "media_pipeline") -> str:
+        summary = self.summary()
+        lines = []
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+
+        if summary["timers"]:
+            for metric, key in (("seconds_total", "total_s"), ("calls_total", "count")):
+                lines.append(f"# TYPE {prefix}_stage_{metric} counter")
+                for stage, timer in sorted(summary["timers"].items()):
+                    lines.append(f'{prefix}_stage_{metric}{{stage="{stage}"}} {timer[key]}')
+            lines.append(f"# TYPE {prefix}_stage_max_seconds gauge")
+            for stage, timer in sorted(summary["timers"].items()):
+                lines.append(f'{prefix}_stage_max_seconds{{stage="{stage}"}} {timer["max_ms"] / 1000}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Writes Prometheus text for *.prom files and a JSON summary otherwise."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.summary(), f, indent=4)
+
+
+@contextmanager
+def profiled(output_file: Optional[str] = None, limit: int = 25):
+    """
+    Runs the enclosed block under cProfile. Stats are dumped to output_file
+    (for pstats/snakeviz), or the top `limit` functions by cumulative time
+    are printed when no file is given.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output_file:
+            profiler.dump_stats(output_file)
+        else:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+            print(out.getvalue())
+
+
+def profile_option(value: Optional[str]):
+    """
+    Context manager for a --profile [FILE] command line option: no profiling
+    when the option is absent (None), printed stats for a bare --profile ("")
+    and a stats dump when a file name is given.
+    """
+    if value is None:
+        return nullcontext()
+    return profiled(value or None)
+
+
+def add_instrumentation_arguments(parser):
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="write stage timings and counters (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="FILE",
+                        help="run under cProfile; print the top functions or dump stats to FILE")
@@ -0,0 +1,64 @@
+import os
+import json
+import hashlib
+from typing import Optional
+
+from catalog_writer import make_temp_file
+
+
+def file_sha256(path: str) -> Optional[str]:
+    """SHA-256 of a file's content; None if the file does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def load_json_state(state_file: Optional[str], description: str) -> dict:
+    """
+    Loads a JSON state or cache file kept between runs. Returns {} if no
+    file is configured or it is missing; an unreadable file is reported
+    (as "Ignoring unreadable <description> ...") and ignored.
+    """
+    if not state_file:
+        return {}
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable {description} {state_file}: {e}")
+        return {}
+
+
+def save_json_state(state_file: Optional[str], state: dict):
+    """Writes state to state_file through a temp file of its own, so concurrent runs cannot mix their writes."""
+    if not state_file:
+        return
+    fd, tmp_file = make_temp_file(state_file)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_file, state_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def write_text_atomic(path: str, text: str):
+    """Replaces path with text through a temp file of its own."""
+    fd, tmp_file = make_temp_file(path)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
@@ -0,0 +1,263 @@
+import os
+import json
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from filename_parser import is_media_file
+from json_state import load_json_state, save_json_state, write_text_atomic
+from instrumentation import Metrics, add_instrumentation_arguments, profile_option
+
+# Sidecar keys written for a probe, in order
+PROBE_KEYS = ("duration", "container", "videoCodec", "audioCodec", "bitrate", "directPlay")
+
+# Containers a browser can play as-is over byte ranges -> (video codecs, audio codecs)
+DIRECT_PLAY = {
+    "mp4": ({"h264"}, {"aac", "mp3"}),
+    "webm": ({"vp8", "vp9", "av1"}, {"opus", "vorbis"}),
+}
+
+# ffprobe format_name -> container; matroska and webm share one demuxer, so the extension decides
+_FORMAT_NAMES = {
+    "mov,mp4,m4a,3gp,3g2,mj2": "mp4",
+    "avi": "avi",
+    "flv": "flv",
+    "asf": "wmv",
+    "mpeg": "mpg",
+}
+
+# (offset, magic bytes, container) for the header parser used without ffprobe
+_MAGIC = (
+    (4, b"ftyp", "mp4"),
+    (0, b"\x1a\x45\xdf\xa3", "mkv"),
+    (0, b"RIFF", "avi"),
+    (0, b"FLV", "flv"),
+    (0, b"\x30\x26\xb2\x75", "wmv"),
+    (0, b"\x00\x00\x01\xba", "mpg"),
+)
+
+FFPROBE = shutil.which("ffprobe")
+FFPROBE_TIMEOUT = 60
+
+
+def is_direct_play(container: Optional[str], video_codec: Optional[str], audio_codec: Optional[str]):
+    """True if a browser can play the file without transcoding; None if the codecs are unknown."""
+    if container not in DIRECT_PLAY:
+        return False
+    if video_codec is None:
+        return None
+    video_codecs, audio_codecs = DIRECT_PLAY[container]
+    return video_codec in video_codecs and (audio_codec is None or audio_codec in audio_codecs)
+
+
+def _number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _probe_ffprobe(media_path: str) -> dict:
+    result = subprocess.run(
+        [FFPROBE, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", media_path],
+        capture_output=True, timeout=FFPROBE_TIMEOUT, check=True
+    )
+    data = json.loads(result.stdout or b"{}")
+    fmt = data.get("format", {})
+
+    container = _FORMAT_NAMES.get(fmt.get("format_name"))
+    if fmt.get("format_name") == "matroska,webm":
+        container = "webm" if media_path.lower().endswith(".webm") else "mkv"
+
+    video_codec = audio_codec = None
+    for stream in data.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind == "video" and video_codec is None and not stream.get("disposition", {}).get("attached_pic"):
+            video_codec = stream.get("codec_name")
+        elif kind == "audio" and audio_codec is None:
+            audio_codec = stream.get("codec_name")
+
+    return {
+        "duration": _number(fmt.get("duration"), float),
+        "container": container or fmt.get("format_name"),
+        "videoCodec": video_codec,
+        "audioCodec": audio_codec,
+        "bitrate": _number(fmt.get("bit_rate"), int),
+        "directPlay": is_direct_play(container, video_codec, audio_codec),
+    }
+
+
+def _probe_header(media_path: str) -> dict:
+    with open(media_path, "rb") as f:
+        header = f.read(64)
+    container = None
+    for offset, magic, name in _MAGIC:
+        if header[offset:offset + len(magic)] == magic:
+            container = name
+            break
+    if container == "mkv" and b"webm" in header:
+        container = "webm"
+    return {
+        "duration": None,
+        "container": container,
+        "videoCodec": None,
+        "audioCodec": None,
+        "bitrate": None,
+        "directPlay": is_direct_play(container, None, None),
+    }
+
+
+def probe_file(media_path: str) -> dict:
+    """
+    Probes one media file with ffprobe, or only identifies its container
+    from the file header when ffprobe is not installed. Unknown values
+    are None.
+    """
+    if FFPROBE:
+        return _probe_ffprobe(media_path)
+    return _probe_header(media_path)
+
+
+def probe_lines(probe: Optional[dict]) -> list:
+    """Returns the sidecar lines for a probe result; unknown values are left out."""
+    lines = []
+    for key in PROBE_KEYS:
+        value = (probe or {}).get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        lines.append(f"{key} : {value}\n")
+    return lines
+
+
+class MediaProber:
+    """
+    Probes media files in a process pool, keeping results in a JSON cache
+    keyed by path and checked against the file's mtime and size, so
+    unchanged files are never probed twice.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, workers: Optional[int] = None,
+                 metrics: Optional[Metrics] = None):
+        self.cache_file = cache_file
+        self.workers = workers
+        self.metrics = metrics or Metrics()
+        self._cache = load_json_state(cache_file, "probe cache")
+
+    def save_cache(self):
+        save_json_state(self.cache_file, self._cache)
+
+    def probe_many(self, paths) -> dict:
+        """Returns {path: probe result} for the paths that could be probed."""
+        results = {}
+        misses = []
+        for media_path in paths:
+            try:
+                st = os.stat(media_path)
+            except OSError:
+                continue
+            entry = self._cache.get(media_path)
+            if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                results[media_path] = entry["probe"]
+            else:
+                misses.append((media_path, st))
+        self.metrics.incr("probe_cache_hits", len(results))
+        if not misses:
+            return results
+
+        with self.metrics.timer("probe"):
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [(media_path, st, pool.submit(probe_file, media_path)) for media_path, st in misses]
+                for media_path, st, future in futures:
+                    try:
+                        probe = future.result()
+                    except Exception as e:
+                        self.metrics.incr("probe_errors")
+                        print(f"Error probing {media_path}: {e}")
+                        continue
+                    results[media_path] = probe
+                    self._cache[media_path] = {"mtime": st.st_mtime_ns, "size": st.st_size, "probe": probe}
+        self.metrics.incr("files_probed", len(misses))
+        return results
+
+
+def replace_lines(text: str, keys, new_lines: list) -> str:
+    """Returns sidecar text with the lines for keys (case-insensitive) replaced by new_lines at the end."""
+    keys = {key.lower() for key in keys}
+    kept = [line for line in text.splitlines(keepends=True)
+            if line.partition(": ")[0].strip().lower() not in keys]
+    if kept and not kept[-1].endswith("\n"):
+        kept[-1] += "\n"
+    return "".join(kept + new_lines)
+
+
+def replace_sidecar_lines(sidecar_path: str, keys, new_lines: list) -> bool:
+    """
+    replace_lines() for a sidecar on disk, written atomically. Returns False
+    if the sidecar already had exactly these lines and was left alone.
+    """
+    with open(sidecar_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    updated = replace_lines(text, keys, new_lines)
+    if updated == text:
+        return False
+
+    write_text_atomic(sidecar_path, updated)
+    return True
+
+
+def update_sidecar(sidecar_path: str, probe: dict) -> bool:
+    """Replaces the probe lines of an existing sidecar; False if nothing changed."""
+    return replace_sidecar_lines(sidecar_path, PROBE_KEYS, probe_lines(probe))
+
+
+def probe_folder(directory: str, cache_file: Optional[str] = None, workers: Optional[int] = None,
+                 metrics: Optional[Metrics] = None) -> int:
+    """
+    Probes every media file under directory that has a sidecar and writes
+    the results into the sidecars. Returns the number of sidecars updated.
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        names = set(files)
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+                     if is_media_file(name) and name + ".txt" in names)
+
+    prober = MediaProber(cache_file, workers, metrics)
+    try:
+        probes = prober.probe_many(paths)
+    finally:
+        prober.save_cache()
+
+    updated = 0
+    for media_path, probe in probes.items():
+        try:
+            updated += update_sidecar(media_path + ".txt", probe)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error updating sidecar for {media_path}: {e}")
+    print(f"Probed {len(probes)} media files, updated {updated} sidecars")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Record duration, codecs and direct-play support of media files in their sidecars."
+    )
+    parser.add_argument("directory", nargs="?", default=r"D:\videos\TV Shows\Chernobyl")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="probe processes (default: one per CPU)")
+    parser.add_argument("--cache-file", default=None,
+                        help="JSON file caching probe results by path, mtime and size")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    if not FFPROBE:
+        print("ffprobe not found; only containers are detected")
+    metrics = Metrics()
+    with profile_option(args.profile):
+        probe_folder(args.directory, args.cache_file, args.workers, metrics)
+    if args.metrics:
+        metrics.write(args.metrics)
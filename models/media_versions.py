@@ -0,0 +1,175 @@
+import os
+import mmap
+import hashlib
+from typing import Optional
+
+from filename_parser import FilenameParser
+from media_probe import replace_sidecar_lines
+from instrumentation import Metrics
+
+# Plex "Optimize" output: <media folder>/Plex Versions/<profile>/<name>.mp4
+PLEX_VERSIONS_DIR = "Plex Versions"
+DIRECT_PLAY_EXTENSIONS = {".mp4", ".m4v", ".webm"}
+CHUNK_SIZE = 1024 * 1024
+
+# Sidecar keys written for a group of versions
+VERSION_KEYS = ("vVersion", "vDuplicate", "directPlayVersion")
+
+
+def fingerprint(media_path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    Cheap identity of a file's content: its size plus a hash of the first
+    and last chunk_size bytes, read through mmap without copying the file.
+    """
+    with open(media_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest = hashlib.blake2b(digest_size=16)
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                digest.update(mm[:chunk_size])
+                digest.update(mm[max(0, size - chunk_size):])
+    return f"{size}:{digest.hexdigest()}"
+
+
+def media_folder(media_path: str) -> str:
+    """The folder a media file belongs to; Plex versions count as part of their original's folder."""
+    parts = os.path.normpath(os.path.dirname(media_path)).split(os.sep)
+    if PLEX_VERSIONS_DIR in parts:
+        parts = parts[:parts.index(PLEX_VERSIONS_DIR)]
+    return os.path.normcase(os.sep.join(parts))
+
+
+def media_identity(media_path: str) -> Optional[tuple]:
+    """
+    The title/episode a media file holds, from its folder and name. None
+    for non-media files and names without a title (like "S01E01.mkv"),
+    which are never grouped.
+    """
+    title, season, episodes, year = FilenameParser.parse_info(media_path)
+    if not title:
+        return None
+    folder = media_folder(media_path)
+    if episodes:
+        return "episode", folder, title.lower(), season, episodes
+    return "title", folder, title.lower(), year
+
+
+def is_plex_version(media_path: str) -> bool:
+    return PLEX_VERSIONS_DIR in os.path.normpath(media_path).split(os.sep)
+
+
+class MediaVersions:
+    """
+    The files holding one title or episode. `primary` is the file that is
+    tagged and indexed; `versions` are the other encodes, and `duplicates`
+    are byte-for-byte copies (same fingerprint) of the primary or a version.
+    """
+
+    __slots__ = ("primary", "versions", "duplicates", "sizes")
+
+    def __init__(self, primary: str, versions: list, duplicates: list, sizes: dict):
+        self.primary = primary
+        self.versions = versions
+        self.duplicates = duplicates
+        self.sizes = sizes
+
+    def others(self) -> list:
+        return self.versions + self.duplicates
+
+    def direct_play(self, probes: Optional[dict] = None) -> Optional[str]:
+        """
+        The best file to stream without transcoding: one a media_probe
+        result marks as direct-play, else one with a browser-friendly
+        extension. Larger files are preferred. None if there is no such file.
+        """
+        probes = probes or {}
+        candidates = []
+        for path in [self.primary] + self.versions:
+            probe = probes.get(path) or {}
+            if probe.get("directPlay") is False:
+                continue
+            if probe.get("directPlay") or os.path.splitext(path)[1].lower() in DIRECT_PLAY_EXTENSIONS:
+                candidates.append((probe.get("directPlay") is True, self.sizes.get(path, 0), path))
+        return max(candidates)[2] if candidates else None
+
+    def sidecar_lines(self, probes: Optional[dict] = None) -> list:
+        """vVersion/vDuplicate/directPlayVersion lines, with paths relative to the primary's folder."""
+        folder = os.path.dirname(self.primary)
+        lines = [f"vVersion : {os.path.relpath(path, folder)}\n" for path in self.versions]
+        lines += [f"vDuplicate : {os.path.relpath(path, folder)}\n" for path in self.duplicates]
+        best = self.direct_play(probes)
+        if best is not None:
+            lines.append(f"directPlayVersion : {os.path.relpath(best, folder)}\n")
+        return lines
+
+
+def group_versions(media_paths, metrics: Optional[Metrics] = None) -> dict:
+    """
+    Groups media files in the same folder (see media_folder) by
+    title/episode identity. Returns {primary path: MediaVersions} for
+    every identity with more than one file; files not in the result are
+    alone and are their own primary.
+
+    The primary is an original rather than a Plex optimized version, the
+    largest one if there are several. Only files in groups are fingerprinted.
+    """
+    metrics = metrics or Metrics()
+    by_identity = {}
+    for media_path in media_paths:
+        identity = media_identity(media_path)
+        if identity is not None:
+            by_identity.setdefault(identity, []).append(media_path)
+
+    groups = {}
+    with metrics.timer("fingerprint"):
+        for paths in by_identity.values():
+            if len(paths) < 2:
+                continue
+            sizes = {}
+            prints = {}
+            for path in paths:
+                try:
+                    sizes[path] = os.path.getsize(path)
+                    prints[path] = fingerprint(path)
+                except OSError as e:
+                    print(f"Error fingerprinting {path}: {e}")
+            paths = sorted(prints, key=lambda p: (is_plex_version(p), -sizes[p], p))
+            if len(paths) < 2:
+                continue
+
+            seen = {}
+            versions = []
+            duplicates = []
+            for path in paths:
+                if prints[path] in seen:
+                    duplicates.append(path)
+                else:
+                    seen[prints[path]] = path
+                    if path != paths[0]:
+                        versions.append(path)
+            groups[paths[0]] = MediaVersions(paths[0], versions, duplicates, sizes)
+            metrics.incr("media_versions", len(versions))
+            metrics.incr("media_duplicates", len(duplicates))
+    return groups
+
+
+def secondary_paths(groups: dict) -> set:
+    """Every file that is a version or duplicate of another, and so is not tagged itself."""
+    return {path for group in groups.values() for path in group.others()}
+
+
+def refresh_version_lines(groups: dict, primaries, probes: Optional[dict] = None) -> int:
+    """
+    Rewrites the version lines of already tagged primaries whose group
+    changed, without tagging them again; primaries no longer in a group
+    lose their version lines. Returns the number of sidecars updated.
+    """
+    updated = 0
+    for primary in primaries:
+        group = groups.get(primary)
+        lines = group.sidecar_lines(probes) if group is not None else []
+        try:
+            updated += replace_sidecar_lines(primary + ".txt", VERSION_KEYS, lines)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error updating versions in sidecar for {primary}: {e}")
+    return updated
@@ -0,0 +1,98 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+DAY = 24 * 60 * 60
+
+
+class OmdbResponseCache:
+    """
+    On-disk cache of OMDb responses backed by SQLite.
+
+    Entries are keyed by the normalized request params (the API key is
+    ignored, values are case-folded), expire after `ttl` seconds and are
+    evicted least-recently-used once more than `max_entries` are stored.
+    "Response": "False" answers are cached too, for `negative_ttl` seconds,
+    so titles OMDb doesn't know are not retried on every run.
+
+    Any object with the same get(params)/set(params, data) methods can be
+    passed to OmdbClient instead.
+    """
+
+    def __init__(self, path: str, ttl: float = 30 * DAY, negative_ttl: float = 2 * DAY,
+                 max_entries: int = 100_000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)")
+        self._size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        return json.dumps(sorted(
+            (k.lower(), str(v).strip().lower())
+            for k, v in params.items()
+            if k != "apikey"
+        ))
+
+    def get(self, params: dict) -> Optional[dict]:
+        key = self.make_key(params)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, params: dict, data: dict):
+        key = self.make_key(params)
+        now = time.time()
+        ttl = self.ttl if data.get("Response") == "True" else self.negative_ttl
+        with self._lock:
+            existed = self._db.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(data), now + ttl, now)
+            )
+            if not existed:
+                self._size += 1
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        # Drop expired entries first, then the least recently used tenth
+        self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+        self._size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = self._size - self.max_entries
+        if excess > 0:
+            excess += self.max_entries // 10
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,)
+            )
+            self._size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
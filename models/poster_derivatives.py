@@ -0,0 +1,243 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+from catalog_writer import make_temp_file
+from json_state import file_sha256, load_json_state, save_json_state
+from media_probe import replace_lines, replace_sidecar_lines
+from instrumentation import Metrics, add_instrumentation_arguments, profile_option
+
+DERIVATIVE_WIDTHS = (150, 300, 600)
+DERIVATIVE_FORMATS = ("jpeg", "webp")
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+
+
+def sidecar_key(width: int, fmt: str) -> str:
+    """Sidecar key for a derivative: image300 for JPEG, image300Webp for WebP."""
+    return f"image{width}" if fmt == "jpeg" else f"image{width}{fmt.capitalize()}"
+
+
+def derivative_path(poster_path: str, width: int, fmt: str) -> str:
+    """<media>.jpg -> <media>.300w.jpg / <media>.300w.webp"""
+    return f"{os.path.splitext(poster_path)[0]}.{width}w{_EXTENSIONS[fmt]}"
+
+
+def render_derivatives(poster_path: str, widths, formats) -> list:
+    """
+    Resizes one poster to each width (never upscaling) and saves a
+    progressive JPEG and/or a WebP of each. Runs in a worker process.
+    Returns the paths written.
+    """
+    written = []
+    with Image.open(poster_path) as image:
+        image = image.convert("RGB")
+        for width in widths:
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+            else:
+                resized = image
+            for fmt in formats:
+                target = derivative_path(poster_path, width, fmt)
+                fd, tmp_file = make_temp_file(target)
+                with os.fdopen(fd, "wb") as f:
+                    if fmt == "jpeg":
+                        resized.save(f, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    else:
+                        resized.save(f, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(tmp_file, target)
+                written.append(target)
+    return written
+
+
+def _copy_derivatives(source_poster: str, poster_path: str, widths, formats):
+    for width in widths:
+        for fmt in formats:
+            target = derivative_path(poster_path, width, fmt)
+            fd, tmp_file = make_temp_file(target)
+            with open(derivative_path(source_poster, width, fmt), "rb") as src, os.fdopen(fd, "wb") as dst:
+                dst.write(src.read())
+            os.replace(tmp_file, target)
+
+
+class DerivativeGenerator:
+    """
+    Generates resized poster thumbnails (DERIVATIVE_WIDTHS, as progressive
+    JPEG and WebP) next to each poster in a process pool.
+
+    Posters are identified by content hash, remembered in state_file
+    between runs, so a poster whose content and options are unchanged and
+    whose derivatives exist is skipped. Posters with the same content,
+    like the copies shared by the episodes of a series, are resized once
+    and the derivatives copied to the others.
+
+    Requires Pillow; WebP is left out if Pillow was built without it.
+    """
+
+    def __init__(self, state_file: Optional[str] = None, workers: Optional[int] = None,
+                 widths=DERIVATIVE_WIDTHS, formats=DERIVATIVE_FORMATS, metrics: Optional[Metrics] = None):
+        if Image is None:
+            raise RuntimeError("Poster derivatives need Pillow (pip install Pillow)")
+        self.state_file = state_file
+        self.workers = workers
+        self.widths = tuple(widths)
+        self.formats = tuple(fmt for fmt in formats if fmt != "webp" or features.check("webp"))
+        self.metrics = metrics or Metrics()
+        self._state = load_json_state(state_file, "derivative state")
+
+    def save_state(self):
+        save_json_state(self.state_file, self._state)
+
+    def sidecar_lines(self, poster_path: str) -> list:
+        """The sidecar lines pointing at a poster's derivatives."""
+        return [
+            f"{sidecar_key(width, fmt)} : {os.path.basename(derivative_path(poster_path, width, fmt))}\n"
+            for width in self.widths for fmt in self.formats
+        ]
+
+    def sidecar_keys(self) -> list:
+        """Every derivative key, so lines for widths or formats no longer generated are dropped too."""
+        widths = sorted(set(self.widths) | set(DERIVATIVE_WIDTHS))
+        return [sidecar_key(width, fmt) for width in widths for fmt in DERIVATIVE_FORMATS]
+
+    def _is_current(self, poster_path: str, sha256: str) -> bool:
+        entry = self._state.get(poster_path)
+        return bool(entry) and entry["sha256"] == sha256 and entry["options"] == [
+            list(self.widths), list(self.formats)
+        ] and all(
+            os.path.exists(derivative_path(poster_path, width, fmt))
+            for width in self.widths for fmt in self.formats
+        )
+
+    def generate_many(self, poster_paths) -> list:
+        """Brings the derivatives of the given posters up to date; returns the posters that have them."""
+        by_hash = {}
+        done = []
+        for poster_path in poster_paths:
+            try:
+                sha256 = file_sha256(poster_path)
+            except OSError:
+                continue
+            if sha256 is None:
+                continue
+            if self._is_current(poster_path, sha256):
+                self.metrics.incr("derivatives_current")
+                done.append(poster_path)
+            else:
+                by_hash.setdefault(sha256, []).append(poster_path)
+        if not by_hash:
+            return done
+
+        options = [list(self.widths), list(self.formats)]
+        with self.metrics.timer("derivatives"):
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    sha256: pool.submit(render_derivatives, paths[0], self.widths, self.formats)
+                    for sha256, paths in by_hash.items()
+                }
+                for sha256, future in futures.items():
+                    source, *copies = by_hash[sha256]
+                    try:
+                        future.result()
+                        for poster_path in copies:
+                            _copy_derivatives(source, poster_path, self.widths, self.formats)
+                    except Exception as e:
+                        self.metrics.incr("derivative_errors")
+                        print(f"Error creating thumbnails for {source}: {e}")
+                        continue
+                    self.metrics.incr("posters_resized")
+                    self.metrics.incr("derivatives_copied", len(copies))
+                    for poster_path in by_hash[sha256]:
+                        self._state[poster_path] = {"sha256": sha256, "options": options}
+                        done.append(poster_path)
+        return done
+
+    def update_text(self, text: str, poster_path: str) -> str:
+        """Returns sidecar text pointing at the poster's derivatives."""
+        return replace_lines(text, self.sidecar_keys(), self.sidecar_lines(poster_path))
+
+    def update_sidecar(self, sidecar_path: str, poster_path: str) -> bool:
+        return replace_sidecar_lines(sidecar_path, self.sidecar_keys(), self.sidecar_lines(poster_path))
+
+
+def apply_derivatives(generator: DerivativeGenerator, texts: dict) -> dict:
+    """
+    Creates thumbnails for the posters of freshly tagged media and points
+    their sidecars at them. texts maps media paths to the sidecar text
+    written; returns it with the text updated to match the sidecars.
+    """
+    posters = [media_path + ".jpg" for media_path in texts if os.path.exists(media_path + ".jpg")]
+    try:
+        done = generator.generate_many(posters)
+    finally:
+        generator.save_state()
+
+    texts = dict(texts)
+    for poster_path in done:
+        media_path = poster_path[:-len(".jpg")]
+        try:
+            generator.update_sidecar(media_path + ".txt", poster_path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error updating sidecar for {media_path}: {e}")
+            continue
+        texts[media_path] = generator.update_text(texts[media_path], poster_path)
+    return texts
+
+
+def derive_folder(directory: str, state_file: Optional[str] = None, workers: Optional[int] = None,
+                  metrics: Optional[Metrics] = None) -> int:
+    """
+    Creates thumbnails for every <media>.jpg poster under directory whose
+    media has a sidecar, and points the sidecars at them. Returns the
+    number of sidecars updated.
+    """
+    posters = []
+    for root, _, files in os.walk(directory):
+        names = set(files)
+        for name in sorted(files):
+            media, ext = os.path.splitext(name)
+            if ext == ".jpg" and media + ".txt" in names:
+                posters.append(os.path.join(root, name))
+
+    generator = DerivativeGenerator(state_file, workers, metrics=metrics)
+    try:
+        done = generator.generate_many(posters)
+    finally:
+        generator.save_state()
+
+    updated = 0
+    for poster_path in done:
+        try:
+            updated += generator.update_sidecar(os.path.splitext(poster_path)[0] + ".txt", poster_path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error updating sidecar for {poster_path}: {e}")
+    print(f"Thumbnails current for {len(done)} posters, updated {updated} sidecars")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create poster thumbnails and point the sidecars at them.")
+    parser.add_argument("directory", nargs="?", default=r"D:\videos\TV Shows\Chernobyl")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="resize processes (default: one per CPU)")
+    parser.add_argument("--state-file", default=None,
+                        help="JSON file remembering poster hashes between runs")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    if Image is None:
+        raise SystemExit("Poster derivatives need Pillow (pip install Pillow)")
+    metrics = Metrics()
+    with profile_option(args.profile):
+        derive_folder(args.directory, args.state_file, args.workers, metrics)
+    if args.metrics:
+        metrics.write(args.metrics)
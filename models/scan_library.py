@@ -0,0 +1,274 @@
+import os
+import time
+import argparse
+from typing import Optional
+
+from compact_records import RecordPacker, record_dict
+from create_json import (
+    add_catalog_output_arguments, load_manifest, manifest_path_for, open_catalog_outputs, parse_movie_data,
+    save_manifest
+)
+from get_movie_metadata import (
+    MediaProcessor, open_processor, process_paths, sidecar_is_stale
+)
+from filename_parser import is_media_file
+from media_probe import MediaProber
+from poster_derivatives import DerivativeGenerator, apply_derivatives
+from media_versions import group_versions, refresh_version_lines, secondary_paths
+from instrumentation import Metrics, add_instrumentation_arguments, profile_option
+
+
+def scan_tree(root_dir: str, metrics: Optional[Metrics] = None):
+    """
+    Yields (dirpath, {name: os.DirEntry}) for every directory under root_dir
+    with one os.scandir() per directory, in the same sorted top-down order
+    as create_json.iter_sidecars. Like os.walk, symlinked directories are
+    not followed. Listing time is recorded as the "walk" stage of metrics.
+    """
+    stack = [root_dir]
+    while stack:
+        dirpath = stack.pop()
+        start = time.perf_counter()
+        files = {}
+        subdirs = []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files[entry.name] = entry
+                    elif not entry.is_symlink():
+                        subdirs.append(entry.name)
+        except OSError:
+            continue
+        finally:
+            if metrics:
+                metrics.observe("walk", time.perf_counter() - start)
+        stack.extend(os.path.join(dirpath, name) for name in sorted(subdirs, reverse=True))
+        yield dirpath, files
+
+
+def _mtime(entry) -> Optional[float]:
+    return entry.stat().st_mtime if entry is not None else None
+
+
+def scan_library(root_dir: str, output_json_file: str, processor: Optional[MediaProcessor] = None,
+                 concurrency: int = 1, refresh_older_than: Optional[float] = None,
+                 incremental: bool = False, manifest_file: Optional[str] = None,
+                 output_format: str = "pretty", sqlite_file: Optional[str] = None,
+                 metrics: Optional[Metrics] = None, shard_dir: Optional[str] = None,
+                 shard_by: str = "series", prober: Optional[MediaProber] = None,
+                 derivatives: Optional[DerivativeGenerator] = None, detect_versions: bool = False,
+                 search_index_file: Optional[str] = None) -> dict:
+    """
+    Tags media and builds the catalog in a single pass over root_dir,
+    instead of get_movie_metadata.process_folder() followed by
+    create_json.text_files_to_json(), which each walk the library.
+
+    The tree is listed once with os.scandir(). With a processor, media
+    files without a current sidecar (see get_movie_metadata.needs_metadata)
+    are tagged, up to `concurrency` at a time. Their sidecars are still
+    written to disk, but the catalog records are parsed from the text that
+    was just rendered rather than read back. Other sidecars are read as
+    text_files_to_json() reads them, including the incremental manifest.
+
+    With a media_probe.MediaProber, the media being tagged is probed first
+    and the results are written into the new sidecars. With a
+    poster_derivatives.DerivativeGenerator, their posters get thumbnails.
+
+    With detect_versions, media holding the same title or episode is
+    grouped (see media_versions): only the primary file of each group is
+    tagged and catalogued, and its record lists the other versions, the
+    duplicates and the best direct-play file.
+
+    The catalog is identical to running both scripts one after the other.
+    Returns text_files_to_json()'s summary plus the number of files tagged.
+    """
+    metrics = metrics or Metrics()
+    if manifest_file is None:
+        manifest_file = manifest_path_for(output_json_file)
+
+    # One listing of the tree: catalog slots in walk order, and the media that needs tagging
+    slots = []
+    media = []
+    now = time.time()
+    for dirpath, files in scan_tree(root_dir, metrics):
+        real_dirpath = os.path.realpath(dirpath)
+        names = {name for name in files if name.endswith(".txt")}
+        if processor is not None or detect_versions:
+            for name, entry in files.items():
+                if not is_media_file(name):
+                    continue
+                sidecar = name + ".txt"
+                is_stale = False
+                if processor is not None:
+                    try:
+                        is_stale = sidecar_is_stale(_mtime(entry), _mtime(files.get(sidecar)),
+                                                    refresh_older_than, now)
+                    except OSError:
+                        continue
+                media.append((os.path.join(dirpath, name), is_stale))
+                if is_stale:
+                    names.add(sidecar)
+        for name in sorted(names):
+            slots.append((os.path.join(dirpath, name), os.path.join(real_dirpath, name)))
+
+    groups = group_versions([media_path for media_path, _ in media], metrics) if detect_versions else {}
+    if groups:
+        # Other versions are listed in their primary's record rather than catalogued themselves
+        secondary = secondary_paths(groups)
+        media = [(media_path, is_stale) for media_path, is_stale in media if media_path not in secondary]
+        slots = [slot for slot in slots if slot[0][:-len(".txt")] not in secondary]
+        metrics.incr("versions_not_tagged", len(secondary))
+    stale = [media_path for media_path, is_stale in media if is_stale]
+    metrics.incr("skipped_current", len(media) - len(stale) if processor is not None else 0)
+
+    rendered = {}
+    probes = None
+    if prober is not None and (stale or groups):
+        try:
+            probes = prober.probe_many(stale + sorted(secondary_paths(groups)))
+        finally:
+            prober.save_cache()
+    if stale:
+        version_lines = {path: groups[path].sidecar_lines(probes) for path in stale if path in groups}
+        with metrics.timer("enrich"):
+            texts = process_paths(processor, stale, concurrency, probes, version_lines)
+        if derivatives is not None:
+            texts = apply_derivatives(derivatives, texts)
+        rendered = {media_path + ".txt": text for media_path, text in texts.items()}
+    refresh_version_lines(groups, [media_path for media_path, is_stale in media if not is_stale], probes)
+
+    packer = RecordPacker()
+    previous = load_manifest(manifest_file, packer) if incremental else {}
+    current = {}
+    summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0,
+               "malformed_lines": 0, "errors": [], "tagged": len(rendered)}
+    season_cache = {}
+
+    sinks, outputs = open_catalog_outputs(output_json_file, output_format, sqlite_file,
+                                          shard_dir, shard_by, root_dir, search_index_file)
+    with sinks:
+        for file_path, full_path in slots:
+            entry = previous.get(file_path)
+            content = rendered.get(file_path)
+            try:
+                start = time.perf_counter()
+                st = os.stat(file_path)
+                if content is None:
+                    if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                        movie = entry["record"]
+                    else:
+                        with open(file_path, "r", encoding="utf-8") as f:
+                            content = f.read()
+                metrics.observe("read", time.perf_counter() - start)
+            except FileNotFoundError:
+                # Tagging failed for media that had no sidecar yet
+                continue
+            except (OSError, UnicodeDecodeError) as e:
+                summary["errors"].append((file_path, str(e)))
+                metrics.incr("sidecar_errors")
+                continue
+
+            if content is not None:
+                stats = {}
+                with metrics.timer("parse"):
+                    movie = parse_movie_data(content, file_path, full_path, stats, season_cache)
+                summary["malformed_lines"] += stats.get("malformed_lines", 0)
+                metrics.incr("sidecars_parsed")
+                summary["updated" if entry else "added"] += 1
+            else:
+                metrics.incr("sidecars_unchanged")
+                summary["unchanged"] += 1
+
+            if movie:
+                with metrics.timer("write"):
+                    record = record_dict(movie)
+                    for output in outputs:
+                        output.write(record)
+                if incremental:
+                    if content is not None:
+                        movie = packer.pack(movie)
+                    current[file_path] = {"mtime": st.st_mtime_ns, "size": st.st_size, "record": movie}
+
+    summary["removed"] = len(previous.keys() - current.keys()) if incremental else 0
+    metrics.incr("sidecars_removed", summary["removed"])
+    metrics.incr("malformed_lines", summary["malformed_lines"])
+    if summary["errors"]:
+        print(f"Could not read {len(summary['errors'])} sidecar files")
+    print(f"Tagged {summary['tagged']} media files; wrote {outputs[0].count} records to {output_json_file}")
+
+    if incremental:
+        try:
+            save_manifest(manifest_file, current)
+        except Exception as e:
+            print(f"Error writing manifest {manifest_file}: {e}")
+    return summary
+
+
+if __name__ == "__main__":
+    OMDB_API_KEY = '34aef2c3'
+
+    parser = argparse.ArgumentParser(
+        description="Tag new media with OMDb metadata and rebuild the JSON catalog in one pass."
+    )
+    parser.add_argument("input_directory", nargs="?", default="../../TV Shows")
+    parser.add_argument("output_file", nargs="?", default="./tv_shows_data.json")
+    parser.add_argument("--api-key", default=os.environ.get("OMDB_API_KEY", OMDB_API_KEY))
+    parser.add_argument("--no-enrich", action="store_true",
+                        help="only build the catalog from existing sidecars")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="number of files tagged in parallel")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="maximum OMDb requests per second")
+    parser.add_argument("--cache-file", default=None,
+                        help="SQLite file caching OMDb responses between runs")
+    parser.add_argument("--listing-episodes", action="store_true",
+                        help="build episodes from the season listing: fewer requests, but series-level "
+                             "plot, credits and poster")
+    parser.add_argument("--refresh-older-than", type=float, default=None, metavar="DAYS",
+                        help="also re-tag media whose sidecar is older than DAYS")
+    parser.add_argument("--poster-state", default=None,
+                        help="JSON file remembering poster ETags/hashes between runs")
+    parser.add_argument("--probe", action="store_true",
+                        help="record duration, codecs and direct-play support (uses ffprobe if installed)")
+    parser.add_argument("--probe-cache", default=None,
+                        help="JSON file caching probe results by path, mtime and size")
+    parser.add_argument("--thumbnails", action="store_true",
+                        help="create 150/300/600 px poster thumbnails (needs Pillow)")
+    parser.add_argument("--thumbnail-state", default=None,
+                        help="JSON file remembering poster hashes so unchanged posters are skipped")
+    parser.add_argument("--versions", action="store_true",
+                        help="catalog each title once and list its other versions and duplicates")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-parse sidecars that changed since the last run")
+    parser.add_argument("--manifest", default=None,
+                        help="manifest path (default: next to the output file)")
+    add_catalog_output_arguments(parser)
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    refresh_older_than = args.refresh_older_than * 86400 if args.refresh_older_than is not None else None
+
+    metrics = Metrics()
+    catalog_options = dict(concurrency=args.concurrency, refresh_older_than=refresh_older_than,
+                           incremental=args.incremental, manifest_file=args.manifest,
+                           output_format=args.format, sqlite_file=args.sqlite, metrics=metrics,
+                           shard_dir=args.shards, shard_by=args.shard_by, detect_versions=args.versions,
+                           search_index_file=args.search_index)
+    with profile_option(args.profile):
+        if args.no_enrich:
+            scan_library(args.input_directory, args.output_file, **catalog_options)
+        else:
+            with open_processor(args.api_key, args.concurrency, args.rate_limit,
+                                cache_file=args.cache_file, listing_episodes=args.listing_episodes,
+                                poster_state_file=args.poster_state, metrics=metrics) as processor:
+                prober = MediaProber(args.probe_cache, metrics=metrics) if args.probe else None
+                derivatives = (DerivativeGenerator(args.thumbnail_state, metrics=metrics)
+                               if args.thumbnails else None)
+                scan_library(args.input_directory, args.output_file, processor,
+                             prober=prober, derivatives=derivatives, **catalog_options)
+    if args.metrics:
+        metrics.write(args.metrics)
@@ -0,0 +1,430 @@
+import os
+import re
+import json
+import bisect
+import heapq
+import hashlib
+import argparse
+import unicodedata
+from typing import Optional
+
+from catalog_writer import make_temp_file
+
+INDEX_VERSION = 1
+
+# Indexed record fields and their weight when ranking matches
+FIELD_WEIGHTS = {
+    "title": 8,
+    "actors": 4,
+    "directors": 4,
+    "writers": 3,
+    "programgenre": 2,
+    "description": 1,
+}
+
+# (lowest rating, bucket) from the top; starrating is OMDb's imdbRating out of 10
+RATING_BUCKETS = ((8.0, "8+"), (7.0, "7-8"), (6.0, "6-7"), (0.0, "<6"))
+FACETS = ("genre", "year", "rating")
+
+# Left out of descriptions only; a title like "It" or "Us" must stay findable
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "he", "her",
+             "his", "in", "into", "is", "it", "its", "of", "on", "or", "she", "that", "the",
+             "their", "they", "this", "to", "was", "who", "with"}
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text) -> list:
+    """Lower-cased, accent-folded word tokens: "Amélie's café" -> ["amelie", "s", "cafe"]."""
+    if not text or not isinstance(text, str):
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+
+def rating_bucket(rating) -> Optional[str]:
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)):
+        return None
+    for lowest, bucket in RATING_BUCKETS:
+        if rating >= lowest:
+            return bucket
+    return None
+
+
+def _field_terms(record: dict) -> dict:
+    terms = {}
+    for field in FIELD_WEIGHTS:
+        value = record.get(field)
+        tokens = []
+        for text in value if isinstance(value, list) else [value]:
+            tokens.extend(tokenize(text))
+        if field == "description":
+            tokens = [token for token in tokens if token not in STOPWORDS]
+        if tokens:
+            terms[field] = sorted(set(tokens))
+    return terms
+
+
+def _document(record: dict) -> dict:
+    """The stored part of a record: what results show and facets count."""
+    year = record.get("movieyear")
+    rating = record.get("starrating")
+    doc = {
+        "file_path": record.get("file_path"),
+        "programid": record.get("programid"),
+        "title": record.get("title"),
+        "year": year if isinstance(year, int) and not isinstance(year, bool) else None,
+        "rating": rating if isinstance(rating, (int, float)) and not isinstance(rating, bool) else None,
+        "genres": list(record.get("programgenre") or ()),
+    }
+    if record.get("isepisode") is True:
+        doc["episodeid"] = record.get("episodeid")
+        doc["season"] = record.get("season")
+    return doc
+
+
+class SearchIndex:
+    """
+    An inverted index over the catalog's title, description, actors,
+    directors, writers and programgenre fields, with facet counts by genre,
+    year and rating bucket.
+
+    Each record is a document keyed by its file_path. update() replaces
+    one document's postings only when its indexed fields changed (compared
+    by hash), and remove() drops it, so the index follows the catalog
+    without being rebuilt. Prefix lookups bisect a sorted term list, so
+    typeahead queries touch only the matching terms rather than every
+    record.
+    """
+
+    def __init__(self):
+        self.docs = []
+        self.hashes = []
+        self.by_path = {}
+        self.postings = {field: {} for field in FIELD_WEIGHTS}
+        self.facets = {facet: {} for facet in FACETS}
+        self._free = []
+        self._terms = None
+        self._order = None
+
+    def update(self, record: dict) -> bool:
+        """Adds or replaces the record's document; returns False if it was already current."""
+        path = record.get("file_path")
+        if path is None:
+            return False
+        doc = _document(record)
+        # Hashed before tokenizing, so unchanged records cost no more than this
+        fields = [record.get(field) for field in FIELD_WEIGHTS]
+        digest = hashlib.blake2b(json.dumps([doc, fields], sort_keys=True, default=str).encode("utf-8"),
+                                 digest_size=16).hexdigest()
+        doc_id = self.by_path.get(path)
+        if doc_id is not None:
+            if self.hashes[doc_id] == digest:
+                return False
+            self._unlink(doc_id)
+        elif self._free:
+            doc_id = self._free.pop()
+        else:
+            doc_id = len(self.docs)
+            self.docs.append(None)
+            self.hashes.append(None)
+
+        # The terms are kept with the document (in memory only) so it can be unlinked later
+        terms = _field_terms(record)
+        doc["terms"] = terms
+        self.docs[doc_id] = doc
+        self.hashes[doc_id] = digest
+        self.by_path[path] = doc_id
+        self._link(doc_id, terms)
+        self._order = None
+        return True
+
+    def remove(self, path: str) -> bool:
+        doc_id = self.by_path.pop(path, None)
+        if doc_id is None:
+            return False
+        self._unlink(doc_id)
+        self.docs[doc_id] = None
+        self.hashes[doc_id] = None
+        self._free.append(doc_id)
+        self._order = None
+        return True
+
+    def _facet_values(self, doc: dict):
+        for genre in doc["genres"]:
+            yield "genre", genre
+        if doc["year"] is not None:
+            yield "year", str(doc["year"])
+        bucket = rating_bucket(doc["rating"])
+        if bucket is not None:
+            yield "rating", bucket
+
+    def _link(self, doc_id: int, terms: dict):
+        for field, tokens in terms.items():
+            postings = self.postings[field]
+            for token in tokens:
+                if token not in postings:
+                    postings[token] = set()
+                    self._terms = None
+                postings[token].add(doc_id)
+        for facet, value in self._facet_values(self.docs[doc_id]):
+            self.facets[facet].setdefault(value, set()).add(doc_id)
+
+    def _unlink(self, doc_id: int):
+        doc = self.docs[doc_id]
+        for field, tokens in doc["terms"].items():
+            postings = self.postings[field]
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del postings[token]
+                        self._terms = None
+        for facet, value in self._facet_values(doc):
+            ids = self.facets[facet].get(value)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.facets[facet][value]
+
+    def terms(self) -> list:
+        """Every indexed term, sorted; rebuilt only after terms were added or dropped."""
+        if self._terms is None:
+            self._terms = sorted(set().union(*(postings.keys() for postings in self.postings.values())))
+        return self._terms
+
+    def title_order(self) -> list:
+        """Each document's rank by (title, file_path), indexed by document id; rebuilt after changes."""
+        if self._order is None:
+            live = [doc_id for doc_id, doc in enumerate(self.docs) if doc is not None]
+            live.sort(key=lambda doc_id: (self.docs[doc_id]["title"] or "", self.docs[doc_id]["file_path"]))
+            self._order = [len(live)] * len(self.docs)
+            for rank, doc_id in enumerate(live):
+                self._order[doc_id] = rank
+        return self._order
+
+    def prefix_terms(self, prefix: str) -> list:
+        terms = self.terms()
+        start = bisect.bisect_left(terms, prefix)
+        end = bisect.bisect_left(terms, prefix + "\U0010ffff")
+        return terms[start:end]
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """Typeahead: the terms starting with prefix, most common first, as (term, count) pairs."""
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        counts = []
+        for term in self.prefix_terms(tokens[-1]):
+            ids = set()
+            for postings in self.postings.values():
+                ids |= postings.get(term, set())
+            counts.append((term, len(ids)))
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts[:limit]
+
+    def _matches(self, terms) -> list:
+        """(weight, doc ids) for each field any of terms occurs in, highest weight first."""
+        fields = []
+        for field, weight in FIELD_WEIGHTS.items():
+            postings = self.postings[field]
+            found = [postings[term] for term in terms if term in postings]
+            if found:
+                fields.append((weight, found[0] if len(found) == 1 else set().union(*found)))
+        return fields
+
+    def search(self, query: str = "", genre: Optional[str] = None, year: Optional[int] = None,
+               rating: Optional[str] = None, limit: int = 20, prefix: bool = True) -> dict:
+        """
+        Finds the documents matching every word of query, the last one as a
+        prefix unless prefix=False, and narrowed by the genre/year/rating
+        bucket filters. Returns the total, the best `limit` documents
+        (ranked by the fields the words matched in, then title) and the
+        facet counts over all matches.
+        """
+        tokens = tokenize(query)
+        words = [self._matches(self.prefix_terms(token) if prefix and position == len(tokens) - 1 else [token])
+                 for position, token in enumerate(tokens)]
+        # Start from the rarest word so later ones only test the few documents left
+        words.sort(key=lambda fields: sum(len(ids) for _, ids in fields))
+
+        matched = None
+        for facet, value in (("genre", genre), ("year", year), ("rating", rating)):
+            if value is not None:
+                ids = self.facets[facet].get(str(value), set())
+                matched = set(ids) if matched is None else matched & ids
+        for fields in words:
+            if matched is None:
+                matched = set().union(*(ids for _, ids in fields))
+            else:
+                matched = set().union(*(matched & ids for _, ids in fields))
+        if matched is None:
+            matched = set(self.by_path.values())
+
+        # A word scores the weight of the best field it matched a document in
+        scores = dict.fromkeys(matched, 0) if words else {}
+        for fields in words:
+            best = {}
+            for weight, ids in reversed(fields):
+                best.update(dict.fromkeys(ids & matched, weight))
+            for doc_id, weight in best.items():
+                scores[doc_id] += weight
+        order = self.title_order()
+        if scores:
+            ranked = heapq.nsmallest(limit, matched, key=lambda doc_id: (-scores[doc_id], order[doc_id]))
+        else:
+            ranked = heapq.nsmallest(limit, matched, key=order.__getitem__)
+        results = [{key: value for key, value in self.docs[doc_id].items() if key != "terms"}
+                   for doc_id in ranked]
+        return {"total": len(matched), "results": results, "facets": self.facet_counts(matched)}
+
+    def facet_counts(self, doc_ids=None) -> dict:
+        """{facet: {value: count}} over doc_ids, or over every document."""
+        counts = {}
+        for facet, values in self.facets.items():
+            if doc_ids is None or len(doc_ids) == len(self.by_path):
+                counts[facet] = {value: len(ids) for value, ids in values.items()}
+            else:
+                counts[facet] = {value: len(ids & doc_ids) for value, ids in values.items()
+                                 if not ids.isdisjoint(doc_ids)}
+            counts[facet] = dict(sorted(counts[facet].items(), key=lambda item: (-item[1], item[0])))
+        return counts
+
+    def to_json(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "docs": [None if doc is None else {key: value for key, value in doc.items() if key != "terms"}
+                     for doc in self.docs],
+            "hashes": self.hashes,
+            "postings": {field: {term: sorted(ids) for term, ids in sorted(postings.items())}
+                         for field, postings in self.postings.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SearchIndex":
+        index = cls()
+        if data.get("version") != INDEX_VERSION:
+            return index
+        index.docs = data["docs"]
+        index.hashes = data["hashes"]
+        for doc_id, doc in enumerate(index.docs):
+            if doc is None:
+                index._free.append(doc_id)
+                continue
+            doc["terms"] = {}
+            index.by_path[doc["file_path"]] = doc_id
+            for facet, value in index._facet_values(doc):
+                index.facets[facet].setdefault(value, set()).add(doc_id)
+        for field, postings in data["postings"].items():
+            if field not in index.postings:
+                continue
+            index.postings[field] = {term: set(ids) for term, ids in postings.items()}
+            # Postings are sorted by term, so each document's terms come back sorted too
+            for term, ids in postings.items():
+                for doc_id in ids:
+                    index.docs[doc_id]["terms"].setdefault(field, []).append(term)
+        return index
+
+
+def load_search_index(index_file: str) -> SearchIndex:
+    """Loads a saved index, or returns an empty one if it is missing, unreadable or outdated."""
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            return SearchIndex.from_json(json.load(f))
+    except FileNotFoundError:
+        return SearchIndex()
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring unreadable search index {index_file}: {e}")
+        return SearchIndex()
+
+
+def save_search_index(index: SearchIndex, index_file: str):
+    fd, tmp_file = make_temp_file(index_file)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index.to_json(), f, separators=(",", ":"))
+    os.replace(tmp_file, index_file)
+
+
+class SearchIndexWriter:
+    """
+    A catalog output that keeps a SearchIndex file in step with the
+    catalog. The previous index is loaded and every written record is
+    passed to update(), which skips documents whose indexed fields did not
+    change; documents for records no longer written are removed on close().
+    The file is only rewritten if something changed.
+    """
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.index = load_search_index(index_file)
+        self.count = 0
+        self.changed = 0
+        self._seen = set()
+
+    def write(self, record: dict):
+        self.count += 1
+        self._seen.add(record.get("file_path"))
+        self.changed += self.index.update(record)
+
+    def close(self):
+        for path in list(self.index.by_path.keys() - self._seen):
+            self.changed += self.index.remove(path)
+        if self.changed or not os.path.exists(self.index_file):
+            save_search_index(self.index, self.index_file)
+
+    def abort(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def build_search_index(records, index_file: str) -> int:
+    """Brings index_file up to date with an iterable of catalog records; returns the documents changed."""
+    with SearchIndexWriter(index_file) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query a catalog search index, or build one from a catalog.")
+    parser.add_argument("index_file", nargs="?", default="./tv_shows_search.json")
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--build", default=None, metavar="CATALOG",
+                        help="update the index from a JSON catalog first")
+    parser.add_argument("--genre", default=None)
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--rating", choices=[bucket for _, bucket in RATING_BUCKETS], default=None)
+    parser.add_argument("--complete", action="store_true",
+                        help="list the terms completing the last word of the query")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.build:
+        from compact_records import load_catalog, record_dict
+
+        changed = build_search_index((record_dict(record) for record in load_catalog(args.build)),
+                                     args.index_file)
+        print(f"Updated {changed} documents in {args.index_file}")
+
+    index = load_search_index(args.index_file)
+    if args.complete:
+        for term, count in index.complete(args.query, args.limit):
+            print(f"{term} ({count})")
+    elif args.query or args.genre or args.year or args.rating or not args.build:
+        found = index.search(args.query, args.genre, args.year, args.rating, args.limit)
+        for doc in found["results"]:
+            print(f"{doc['title']} ({doc['year']}) - {doc['file_path']}")
+        print(f"{found['total']} matches")
+        for facet, counts in found["facets"].items():
+            print(f"{facet}: " + ", ".join(f"{value} ({count})" for value, count in list(counts.items())[:10]))
@@ -0,0 +1,114 @@
+import os
+import random
+import argparse
+
+GENRES = ["Drama", "Comedy", "Thriller", "History", "Animation", "Documentary", "Crime"]
+PEOPLE = [f"Person {i}" for i in range(500)]
+RELEASE_TAGS = ["1080p WEB H264", "2160p UHD BluRay HEVC", "1080p BluRay", "720p WEB", "DVDRip"]
+
+
+def make_sidecar_text(i, rng, malformed_lines=0, is_episode=None, title=None):
+    """Builds sidecar text in the format MetadataWriter.write produces."""
+    if is_episode is None:
+        is_episode = rng.random() < 0.6
+    lines = [
+        f"title : {title or f'Title {i}'}",
+        f"movieYear : {rng.randint(1950, 2025)}",
+        f"programId : tt{i:07d}",
+        f"seriesId : tt{i // 10:07d}",
+    ]
+    if is_episode:
+        lines.append(f"episodeId : tt{i + 5000000:07d}")
+    lines += [
+        f"description : Synthetic description number {i}: with a colon.",
+        f"isEpisode : {'true' if is_episode else 'false'}",
+        f"isEpisodic : {'true' if is_episode else 'false'}",
+    ]
+    lines += [f"vProgramGenre : {g}" for g in rng.sample(GENRES, 3)]
+    lines += [f"vDirector : {p}" for p in rng.sample(PEOPLE, 1)]
+    lines += [f"vWriter : {p}" for p in rng.sample(PEOPLE, 2)]
+    lines += [f"vActor : {p}" for p in rng.sample(PEOPLE, 4)]
+    lines += [
+        "mpaaRating : TV-MA",
+        f"starRating : {rng.choice(['N/A', str(round(rng.uniform(1, 10), 1))])}",
+        f"image : Title {i}.mkv.jpg",
+    ]
+    lines += ["garbage line without separator"] * malformed_lines
+    rng.shuffle(lines)
+    return "\n".join(lines) + "\n"
+
+
+def _write_media(media_path, rng, index, sidecars, malformed_ratio, media_size, is_episode, title):
+    os.makedirs(os.path.dirname(media_path), exist_ok=True)
+    with open(media_path, "wb") as f:
+        if media_size:
+            f.write(rng.randbytes(media_size))
+    if sidecars:
+        malformed = rng.randint(20, 200) if rng.random() < malformed_ratio else 0
+        with open(media_path + ".txt", "w", encoding="utf-8") as f:
+            f.write(make_sidecar_text(index, rng, malformed, is_episode, title))
+
+
+def generate_library(root, films=100, series=10, seasons=3, episodes=10, nesting=0,
+                     nested_ratio=0.0, malformed_ratio=0.0, sidecars=True, media_size=0, seed=1):
+    """
+    Creates a synthetic media library under root:
+    - root/Films/<Title> (<year>)/<Title> <year> <tags>.mkv
+    - root/TV Shows/<Show>/Season NN/<Show> SxxEyy <tags>.mkv
+    A nested_ratio fraction of items is pushed `nesting` extra folders deep.
+    Media files hold media_size random bytes (0 = empty) and, with sidecars,
+    get a .txt sidecar of which malformed_ratio carry 20-200 bad lines.
+    Returns the number of media files written.
+    """
+    rng = random.Random(seed)
+    count = 0
+
+    def nested(path):
+        if nesting and rng.random() < nested_ratio:
+            extra = [f"Extras {level}" for level in range(nesting)]
+            return os.path.join(path, *extra)
+        return path
+
+    for i in range(films):
+        year = rng.randint(1950, 2025)
+        title = f"Film {i}"
+        folder = nested(os.path.join(root, "Films", f"{title} ({year})"))
+        name = f"{title} {year} {rng.choice(RELEASE_TAGS)}.mkv"
+        _write_media(os.path.join(folder, name), rng, count, sidecars, malformed_ratio,
+                     media_size, False, title)
+        count += 1
+
+    for s in range(series):
+        show = f"Show {s}"
+        for season in range(1, seasons + 1):
+            folder = nested(os.path.join(root, "TV Shows", show, f"Season {season:02d}"))
+            tags = rng.choice(RELEASE_TAGS)
+            for episode in range(1, episodes + 1):
+                name = f"{show} S{season:02d}E{episode:02d} {tags}.mkv"
+                _write_media(os.path.join(folder, name), rng, count, sidecars, malformed_ratio,
+                             media_size, True, f"{show} episode {episode}")
+                count += 1
+
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic media library for benchmarks.")
+    parser.add_argument("root")
+    parser.add_argument("--films", type=int, default=100)
+    parser.add_argument("--series", type=int, default=10)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--nesting", type=int, default=0,
+                        help="extra folder levels for nested items")
+    parser.add_argument("--nested-ratio", type=float, default=0.0)
+    parser.add_argument("--malformed-ratio", type=float, default=0.0)
+    parser.add_argument("--no-sidecars", action="store_true")
+    parser.add_argument("--media-size", type=int, default=0, help="bytes per media file")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    total = generate_library(args.root, args.films, args.series, args.seasons, args.episodes,
+                             args.nesting, args.nested_ratio, args.malformed_ratio,
+                             not args.no_sidecars, args.media_size, args.seed)
+    print(f"Generated {total} media files under {args.root}")
@@ -0,0 +1,58 @@
+import os
+import json
+
+from catalog_shards import INDEX_FILE, ShardedCatalogWriter, load_index, shard_file_name
+
+
+def _film(program_id, title):
+    return {"programid": program_id, "title": title, "isepisodic": False}
+
+
+def _episode(program_id, series_id, title):
+    return {"programid": program_id, "title": title, "isepisodic": True, "seriesid": series_id}
+
+
+def _write(output_dir, records, **kwargs):
+    with ShardedCatalogWriter(str(output_dir), **kwargs) as writer:
+        for record in records:
+            writer.write(record)
+    return writer
+
+
+def _load(output_dir, file_name):
+    with open(os.path.join(output_dir, file_name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_only_changed_shards_are_rewritten_and_gone_ones_removed(tmp_path):
+    records = [_film(1, "Heat"), _episode(2, "tt01", "Pilot"), _episode(3, "tt02", "Pilot")]
+    writer = _write(tmp_path, records)
+    assert sorted(writer.changed) == ["films", "tt01", "tt02"]
+    index = load_index(str(tmp_path))
+    assert index["count"] == 3
+    assert index["programs"] == {"1": "films", "2": "tt01", "3": "tt02"}
+    modified = index["shards"]["tt01"]["modified"]
+    os.utime(tmp_path / "tt01.json", (0, 0))
+
+    writer = _write(tmp_path, [_film(1, "Heat 2"), _episode(2, "tt01", "Pilot")])
+    assert sorted(writer.changed) == ["films", "tt02"]
+    index = load_index(str(tmp_path))
+    assert sorted(index["shards"]) == ["films", "tt01"]
+    assert index["shards"]["tt01"]["modified"] == modified
+    assert os.stat(tmp_path / "tt01.json").st_mtime == 0
+    assert _load(tmp_path, "films.json")[0]["title"] == "Heat 2"
+    assert sorted(os.listdir(tmp_path)) == ["films.json", INDEX_FILE, "tt01.json"]
+
+
+def test_a_shard_named_index_does_not_replace_the_index(tmp_path):
+    root = tmp_path / "library"
+    output = tmp_path / "shards"
+    record = dict(_film(1, "Heat"), file_path=str(root / "index" / "Heat.mkv.txt"))
+    _write(output, [record], key="folder", root_dir=str(root))
+
+    file_name = shard_file_name("index", "pretty")
+    assert file_name != INDEX_FILE
+    index = load_index(str(output))
+    assert index["shards"]["index"]["file"] == file_name
+    assert _load(output, file_name)[0]["title"] == "Heat"
+    assert sorted(os.listdir(output)) == sorted([file_name, INDEX_FILE])
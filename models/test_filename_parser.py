@@ -0,0 +1,48 @@
+import pytest
+
+from filename_parser import FilenameParser, is_media_file
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("Show.Name.S01E02.1080p.mkv", ("Show Name", 1, 2)),
+    ("Show Name 1x02.mkv", ("Show Name", 1, 2)),
+    ("Show Name 12x10 HEVC.mp4", ("Show Name", 12, 10)),
+    ("Heat.1995.1080p.BluRay.mkv", ("Heat", None, None)),
+    ("Heat (1995).mkv", ("Heat", None, None)),
+    ("2012 (2009).mkv", ("2012", None, None)),
+    ("Despicable Me 2 2013 1080p DTS-HD MA5.1x264.mkv", ("Despicable Me 2", None, None)),
+    ("Heat 1995 AC3.5.1x264.mkv", ("Heat", None, None)),
+    ("Heat 1995 x265.mkv", ("Heat", None, None)),
+    ("10x10 2018.mkv", ("10x10", None, None)),
+    ("10x10.mkv", ("10x10", None, None)),
+    ("notes.txt", (None, None, None)),
+])
+def test_parse(filename, expected):
+    assert FilenameParser.parse(filename) == expected
+
+
+@pytest.mark.parametrize("filename, episodes", [
+    ("Show S01E01E02.mkv", (1, 2)),
+    ("Show S01E01-E02.mkv", (1, 2)),
+    ("Show.S02E03E04E05.720p.mkv", (3, 4, 5)),
+    ("Show 1x02.mkv", (2,)),
+])
+def test_parse_info_keeps_every_episode(filename, episodes):
+    info = FilenameParser.parse_info(filename)
+    assert info.title == "Show"
+    assert info.episodes == episodes
+
+
+def test_parse_info_keeps_the_year():
+    assert FilenameParser.parse_info("Heat (1995).mkv").year == 1995
+    assert FilenameParser.parse_info("Show 2019 S01E01.mkv") == ("Show 2019", 1, (1,), 2019)
+
+
+def test_parse_many_matches_parse():
+    paths = ["/tv/Show/Show S01E02.mkv", "/films/Heat (1995).mkv", "/films/poster.jpg"]
+    assert FilenameParser.parse_many(paths) == [FilenameParser.parse(path) for path in paths]
+
+
+def test_is_media_file():
+    assert is_media_file("Heat.MKV")
+    assert not is_media_file("Heat.mkv.txt")
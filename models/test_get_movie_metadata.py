@@ -0,0 +1,120 @@
+import os
+import stat
+import threading
+import time
+
+from fake_omdb_server import POSTER_BYTES, FakeOmdbServer
+from get_movie_metadata import PosterDownloader, RateLimiter, process_folder
+
+
+def _films(folder, count):
+    for i in range(count):
+        (folder / f"Film {i} (2001).mkv").write_bytes(b"")
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(50)
+    times = []
+    lock = threading.Lock()
+
+    def call():
+        for _ in range(5):
+            limiter.wait()
+            with lock:
+                times.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Wake-up jitter can bunch two calls together, but none may run before its slot
+    times.sort()
+    assert len(times) == 20
+    for k, called in enumerate(times):
+        assert called - start >= k * limiter.interval
+
+
+def test_concurrent_files_stay_within_the_concurrency_bound(tmp_path):
+    _films(tmp_path, 12)
+    with FakeOmdbServer(latency=0.05) as server:
+        process_folder(str(tmp_path), "key", concurrency=3, base_url=server.url)
+
+    assert server.requests["title"] == 12
+    assert 2 <= server.max_in_flight <= 3
+    assert len(list(tmp_path.glob("*.mkv.txt"))) == 12
+
+
+def test_rate_limit_spaces_omdb_requests_from_concurrent_workers(tmp_path):
+    _films(tmp_path, 8)
+    with FakeOmdbServer() as server:
+        start = time.monotonic()
+        process_folder(str(tmp_path), "key", concurrency=4, rate_limit=20, base_url=server.url)
+
+    times = sorted(server.api_times)
+    assert len(times) == 8
+    for k, arrived in enumerate(times):
+        assert arrived - start >= k / 20
+
+
+def _episodes(folder, count):
+    season = folder / "Show" / "Season 01"
+    season.mkdir(parents=True)
+    for episode in range(1, count + 1):
+        (season / f"Show S01E{episode:02d}.mkv").write_bytes(b"")
+    return season
+
+
+def test_episodes_get_their_own_records_by_default(tmp_path):
+    season = _episodes(tmp_path, 3)
+    with FakeOmdbServer() as server:
+        process_folder(str(tmp_path), "key", base_url=server.url)
+
+    assert server.requests["episode"] == 3 and server.requests["season"] == 0
+    sidecar = (season / "Show S01E02.mkv.txt").read_text(encoding="utf-8")
+    assert "description : Plot of episode 2.\n" in sidecar
+
+
+def test_listing_episodes_is_opt_in(tmp_path):
+    season = _episodes(tmp_path, 3)
+    with FakeOmdbServer() as server:
+        process_folder(str(tmp_path), "key", base_url=server.url, listing_episodes=True)
+
+    assert server.requests["episode"] == 0 and server.requests["season"] == 1
+    sidecar = (season / "Show S01E02.mkv.txt").read_text(encoding="utf-8")
+    assert "title : Episode 2\n" in sidecar
+
+
+def test_posters_are_reused_revalidated_and_readable(tmp_path):
+    state_file = str(tmp_path / "posters.json")
+    first = str(tmp_path / "A.mkv")
+    second = str(tmp_path / "B.mkv")
+    old_umask = os.umask(0o022)
+    try:
+        with FakeOmdbServer() as server:
+            movie = {"Poster": server.url + "posters/tt0000001.jpg"}
+            downloader = PosterDownloader(state_file=state_file)
+            assert downloader.download(movie, first) == first + ".jpg"
+            assert downloader.download(movie, second) == second + ".jpg"
+            downloader.save_state()
+            assert server.requests["poster"] == 1
+            assert downloader.metrics.counters["posters_reused"] == 1
+
+            # A later run revalidates with the remembered ETag and gets a 304
+            os.remove(second + ".jpg")
+            downloader = PosterDownloader(state_file=state_file)
+            assert downloader.download(movie, first) == first + ".jpg"
+            assert downloader.download(movie, second) == second + ".jpg"
+            assert server.requests["poster"] == 1
+            assert server.requests["poster_not_modified"] == 1
+            assert downloader.metrics.counters["posters_not_modified"] == 1
+    finally:
+        os.umask(old_umask)
+
+    for image_path in (first + ".jpg", second + ".jpg"):
+        with open(image_path, "rb") as f:
+            assert f.read() == POSTER_BYTES
+        assert stat.S_IMODE(os.stat(image_path).st_mode) == 0o644
+    assert sorted(os.listdir(tmp_path)) == ["A.mkv.jpg", "B.mkv.jpg", "posters.json"]
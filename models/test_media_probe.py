@@ -0,0 +1,98 @@
+import json
+import subprocess
+
+import media_probe
+from media_probe import _probe_ffprobe, _probe_header, is_direct_play, probe_lines, update_sidecar
+
+# Trimmed `ffprobe -print_format json -show_format -show_streams` output for an MP4
+FFPROBE_MP4 = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}},
+        {"codec_type": "video", "codec_name": "h264", "disposition": {"attached_pic": 0}},
+        {"codec_type": "audio", "codec_name": "aac"},
+        {"codec_type": "audio", "codec_name": "ac3"},
+    ],
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "5400.250000", "bit_rate": "4500000"},
+}
+FFPROBE_MKV = {
+    "streams": [{"codec_type": "video", "codec_name": "hevc"}, {"codec_type": "audio", "codec_name": "dts"}],
+    "format": {"format_name": "matroska,webm", "duration": "N/A"},
+}
+
+HEADERS = {
+    "film.mp4": b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00",
+    "film.mkv": b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\x82\x88matroska",
+    "film.webm": b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\x82\x84webm",
+    "film.avi": b"RIFF\x00\x00\x00\x00AVI LIST",
+    "film.flv": b"FLV\x01\x05",
+    "film.wmv": b"\x30\x26\xb2\x75\x8e\x66\xcf\x11",
+    "film.mpg": b"\x00\x00\x01\xba\x44\x00",
+    "film.mov": b"junk that matches nothing",
+}
+
+
+def _fake_run(output):
+    def run(args, **kwargs):
+        return subprocess.CompletedProcess(args, 0, stdout=json.dumps(output).encode(), stderr=b"")
+    return run
+
+
+def test_is_direct_play():
+    assert is_direct_play("mp4", "h264", "aac") is True
+    assert is_direct_play("mp4", "h264", None) is True
+    assert is_direct_play("mp4", "hevc", "aac") is False
+    assert is_direct_play("mp4", "h264", "ac3") is False
+    assert is_direct_play("webm", "vp9", "opus") is True
+    assert is_direct_play("mkv", "h264", "aac") is False
+    assert is_direct_play("mp4", None, None) is None
+
+
+def test_probe_header_identifies_containers(tmp_path):
+    expected = {"film.mp4": "mp4", "film.mkv": "mkv", "film.webm": "webm", "film.avi": "avi",
+                "film.flv": "flv", "film.wmv": "wmv", "film.mpg": "mpg", "film.mov": None}
+    for name, header in HEADERS.items():
+        path = tmp_path / name
+        path.write_bytes(header + bytes(64))
+        probe = _probe_header(str(path))
+        assert probe["container"] == expected[name], name
+        assert probe["duration"] is None and probe["videoCodec"] is None
+    assert _probe_header(str(tmp_path / "film.mp4"))["directPlay"] is None
+    assert _probe_header(str(tmp_path / "film.mkv"))["directPlay"] is False
+
+
+def test_probe_ffprobe_parses_canned_output(monkeypatch):
+    monkeypatch.setattr(media_probe, "FFPROBE", "ffprobe")
+    monkeypatch.setattr(subprocess, "run", _fake_run(FFPROBE_MP4))
+    assert _probe_ffprobe("film.mp4") == {
+        "duration": 5400.25, "container": "mp4", "videoCodec": "h264", "audioCodec": "aac",
+        "bitrate": 4500000, "directPlay": True,
+    }
+
+    monkeypatch.setattr(subprocess, "run", _fake_run(FFPROBE_MKV))
+    assert _probe_ffprobe("film.mkv") == {
+        "duration": None, "container": "mkv", "videoCodec": "hevc", "audioCodec": "dts",
+        "bitrate": None, "directPlay": False,
+    }
+    assert _probe_ffprobe("film.webm")["container"] == "webm"
+
+
+def test_probe_lines_skip_unknown_values():
+    probe = {"duration": 5400.25, "container": "mp4", "videoCodec": "h264", "audioCodec": None,
+             "bitrate": None, "directPlay": True}
+    assert probe_lines(probe) == [
+        "duration : 5400.25\n", "container : mp4\n", "videoCodec : h264\n", "directPlay : true\n",
+    ]
+    assert probe_lines(None) == []
+
+
+def test_update_sidecar_replaces_only_probe_lines(tmp_path):
+    sidecar = tmp_path / "film.mp4.txt"
+    sidecar.write_text("title : Film\ncontainer : mkv\nvActor : Someone\ndirectPlay : false", encoding="utf-8")
+    probe = {"duration": 60.0, "container": "mp4", "videoCodec": "h264", "audioCodec": "aac",
+             "bitrate": 1000, "directPlay": True}
+
+    assert update_sidecar(str(sidecar), probe) is True
+    assert sidecar.read_text(encoding="utf-8") == (
+        "title : Film\nvActor : Someone\n" + "".join(probe_lines(probe))
+    )
+    assert update_sidecar(str(sidecar), probe) is False
@@ -0,0 +1,85 @@
+import os
+
+from media_versions import group_versions, media_identity
+from scan_library import scan_library
+from compact_records import load_catalog, record_dict
+
+
+def _write(path, data=b"", text=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if text is not None:
+        with open(path + ".txt", "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def test_untitled_episodes_of_different_shows_are_not_grouped(tmp_path):
+    alpha = str(tmp_path / "Alpha" / "Season 01" / "S01E01.mkv")
+    beta = str(tmp_path / "Beta" / "Season 01" / "S01E01.mkv")
+    _write(alpha, b"alpha" * 100, "title : Alpha\n")
+    _write(beta, b"beta" * 100, "title : Beta\n")
+
+    assert media_identity(alpha) is None
+    assert group_versions([alpha, beta]) == {}
+
+    catalog = str(tmp_path / "catalog.json")
+    scan_library(str(tmp_path), catalog, detect_versions=True)
+    titles = sorted(record_dict(record)["title"] for record in load_catalog(catalog))
+    assert titles == ["Alpha", "Beta"]
+    with open(alpha + ".txt", encoding="utf-8") as f:
+        assert f.read() == "title : Alpha\n"
+
+
+def test_same_title_in_different_folders_is_not_grouped(tmp_path):
+    first = str(tmp_path / "Films" / "Heat" / "Heat.mkv")
+    second = str(tmp_path / "Remakes" / "Heat" / "Heat.mkv")
+    _write(first, b"first" * 100)
+    _write(second, b"second" * 100)
+
+    assert group_versions([first, second]) == {}
+
+
+def test_plex_versions_and_copies_group_with_their_original(tmp_path):
+    folder = tmp_path / "Films" / "Heat (1995)"
+    original = str(folder / "Heat (1995).mkv")
+    optimized = str(folder / "Plex Versions" / "Optimized for Mobile" / "Heat (1995).mp4")
+    copy = str(folder / "Heat.1995.mp4")
+    _write(original, b"\x1a\x45\xdf\xa3" + b"m" * 5000, "title : Heat\n")
+    _write(optimized, b"\x00\x00\x00\x18ftypisom" + b"p" * 1000)
+    _write(copy, b"\x00\x00\x00\x18ftypisom" + b"p" * 1000)
+
+    groups = group_versions([original, optimized, copy])
+    assert list(groups) == [original]
+    assert groups[original].versions == [copy]
+    assert groups[original].duplicates == [optimized]
+    assert groups[original].direct_play() == copy
+
+    catalog = str(tmp_path / "catalog.json")
+    scan_library(str(tmp_path), catalog, detect_versions=True)
+    records = [record_dict(record) for record in load_catalog(catalog)]
+    assert len(records) == 1
+    assert records[0]["versions"] == ["Heat.1995.mp4"]
+    assert records[0]["duplicates"] == [os.path.join("Plex Versions", "Optimized for Mobile", "Heat (1995).mp4")]
+    assert records[0]["directplayversion"] == "Heat.1995.mp4"
+
+
+def test_deleted_version_is_dropped_from_sidecar_and_catalog(tmp_path):
+    folder = tmp_path / "Films" / "Heat (1995)"
+    original = str(folder / "Heat (1995).mkv")
+    copy = str(folder / "Heat.1995.mp4")
+    _write(original, b"\x1a\x45\xdf\xa3" + b"m" * 5000, "title : Heat\n")
+    _write(copy, b"\x00\x00\x00\x18ftypisom" + b"p" * 1000)
+
+    catalog = str(tmp_path / "catalog.json")
+    scan_library(str(tmp_path), catalog, detect_versions=True)
+    assert record_dict(load_catalog(catalog)[0])["directplayversion"] == "Heat.1995.mp4"
+
+    os.remove(copy)
+    scan_library(str(tmp_path), catalog, detect_versions=True)
+    records = [record_dict(record) for record in load_catalog(catalog)]
+    assert len(records) == 1
+    assert "directplayversion" not in records[0]
+    assert "versions" not in records[0]
+    with open(original + ".txt", encoding="utf-8") as f:
+        assert f.read() == "title : Heat\n"
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+pytest.importorskip("inotify_simple")
+from inotify_simple import Event, flags
+
+from create_json import load_manifest, manifest_path_for, text_files_to_json
+from watch_catalog import _InotifySource
+
+
+def test_queue_overflow_rescans_the_tree(tmp_path):
+    show = tmp_path / "Show"
+    show.mkdir()
+    for name in ("a.mkv.txt", "b.mkv.txt"):
+        (show / name).write_text("title : Show\n", encoding="utf-8")
+    catalog = str(tmp_path / "catalog.json")
+    text_files_to_json(str(tmp_path), catalog, incremental=True)
+    manifest = load_manifest(manifest_path_for(catalog))
+
+    source = _InotifySource(str(tmp_path))
+    try:
+        # Changes whose events were lost to the overflow
+        (show / "a.mkv.txt").write_text("title : Show, edited\n", encoding="utf-8")
+        os.remove(show / "b.mkv.txt")
+        (show / "c.mkv.txt").write_text("title : Show\n", encoding="utf-8")
+        source._inotify.read = lambda timeout=None: [Event(wd=-1, mask=flags.Q_OVERFLOW, cookie=0, name="")]
+
+        changed = source.changes(manifest, timeout=0)
+    finally:
+        source.close()
+
+    assert changed == {str(show / name) for name in ("a.mkv.txt", "b.mkv.txt", "c.mkv.txt")}
@@ -0,0 +1,246 @@
+import os
+import time
+import argparse
+import threading
+from typing import Optional
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+from compact_records import RecordPacker, record_dict
+from create_json import (
+    add_catalog_output_arguments, iter_sidecars, load_manifest, manifest_path_for, open_catalog_outputs, parse_movie_data,
+    save_manifest, text_files_to_json, walk_order_key
+)
+
+
+class _PollingSource:
+    """Finds changed sidecars by comparing a stat() of every sidecar with the manifest."""
+
+    def __init__(self, root_dir: str, interval: float):
+        self.root_dir = root_dir
+        self.interval = interval
+        self._last_scan = time.monotonic()
+
+    def changes(self, manifest: dict, timeout: float) -> set:
+        wait = self._last_scan + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if self._last_scan + self.interval > time.monotonic():
+                return set()
+        self._last_scan = time.monotonic()
+
+        changed = set()
+        seen = set()
+        for file_path, _ in iter_sidecars(self.root_dir):
+            seen.add(file_path)
+            entry = manifest.get(file_path)
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            if not entry or entry["mtime"] != st.st_mtime_ns or entry["size"] != st.st_size:
+                changed.add(file_path)
+        changed.update(manifest.keys() - seen)
+        return changed
+
+    def close(self):
+        pass
+
+
+class _InotifySource:
+    """Collects changed sidecars from inotify watches on every directory under the root."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._inotify = INotify()
+        self._mask = (flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE
+                      | flags.DELETE | flags.DELETE_SELF)
+        self._dirs = {}
+        self._watch_tree(root_dir)
+
+    def _watch_tree(self, top: str) -> set:
+        """Watches top and its subdirectories; returns the sidecars found inside."""
+        found = set()
+        for dirpath, dirnames, filenames in os.walk(top):
+            try:
+                self._dirs[self._inotify.add_watch(dirpath, self._mask)] = dirpath
+            except OSError:
+                continue
+            found.update(os.path.join(dirpath, f) for f in filenames if f.endswith(".txt"))
+        return found
+
+    def changes(self, manifest: dict, timeout: float) -> set:
+        changed = set()
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & flags.Q_OVERFLOW:
+                # The kernel dropped events (wd is -1); rescan the whole tree instead
+                print(f"inotify queue overflowed; rescanning {self.root_dir}")
+                self._watch_tree(self.root_dir)
+                changed.update(_PollingSource(self.root_dir, 0).changes(manifest, 0))
+                continue
+            directory = self._dirs.get(event.wd)
+            if directory is None:
+                continue
+            if event.mask & (flags.DELETE_SELF | flags.IGNORED):
+                self._dirs.pop(event.wd, None)
+                continue
+
+            path = os.path.join(directory, event.name)
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO):
+                    changed.update(self._watch_tree(path))
+                else:
+                    prefix = path + os.sep
+                    changed.update(p for p in manifest if p.startswith(prefix))
+            elif event.name.endswith(".txt"):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        self._inotify.close()
+
+
+class CatalogWatcher:
+    """
+    Keeps a JSON catalog in sync with the sidecars under root_dir.
+    Records are held in memory as compact_records.CompactRecords.
+
+    After an initial incremental build, changes are picked up through inotify
+    when the optional inotify_simple package (pip install inotify_simple) is
+    available (Linux), or by polling the sidecars' mtime/size every
+    poll_interval seconds. Changed
+    paths are collected until no new change has arrived for `debounce`
+    seconds (or `max_delay` has passed since the first one). Then only
+    those sidecars are re-parsed, and the catalog and manifest are rewritten
+    atomically in one batch. With shard_dir, only the shards that changed
+    are replaced, and a search index only re-indexes the changed records.
+    """
+
+    def __init__(self, root_dir: str, output_json_file: str, manifest_file: Optional[str] = None,
+                 output_format: str = "pretty", sqlite_file: Optional[str] = None,
+                 debounce: float = 2.0, max_delay: float = 30.0, poll_interval: float = 10.0,
+                 use_inotify: bool = True, shard_dir: Optional[str] = None, shard_by: str = "series",
+                 search_index_file: Optional[str] = None):
+        self.root_dir = root_dir
+        self.output_json_file = output_json_file
+        self.manifest_file = manifest_file or manifest_path_for(output_json_file)
+        self.output_format = output_format
+        self.sqlite_file = sqlite_file
+        self.shard_dir = shard_dir
+        self.shard_by = shard_by
+        self.search_index_file = search_index_file
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and INotify is not None
+        self.manifest = {}
+        self._packer = RecordPacker()
+        self._season_cache = {}
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        # Start watching before the initial build so changes made during it are not lost
+        source = _InotifySource(self.root_dir) if self.use_inotify else None
+        text_files_to_json(self.root_dir, self.output_json_file, incremental=True,
+                           manifest_file=self.manifest_file, output_format=self.output_format,
+                           sqlite_file=self.sqlite_file, shard_dir=self.shard_dir, shard_by=self.shard_by,
+                           search_index_file=self.search_index_file)
+        self.manifest = load_manifest(self.manifest_file, self._packer)
+        if source is None:
+            source = _PollingSource(self.root_dir, self.poll_interval)
+        print(f"Watching {self.root_dir} ({'inotify' if self.use_inotify else 'polling'})")
+
+        pending = set()
+        first_change = last_change = 0.0
+        try:
+            while not self._stop.is_set():
+                # Polling reports a pending path again on every scan; only new paths restart the debounce
+                changes = source.changes(self.manifest, timeout=min(self.debounce, 1.0)) - pending
+                now = time.monotonic()
+                if changes:
+                    if not pending:
+                        first_change = now
+                    pending |= changes
+                    last_change = now
+                if pending and (now - last_change >= self.debounce or now - first_change >= self.max_delay):
+                    self.apply(pending)
+                    pending = set()
+        finally:
+            if pending:
+                self.apply(pending)
+            source.close()
+
+    def apply(self, paths) -> dict:
+        """Re-parses the given sidecars and rewrites the catalog; returns updated/removed counts."""
+        counts = {"updated": 0, "removed": 0, "errors": 0}
+        for file_path in paths:
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                if self.manifest.pop(file_path, None) is not None:
+                    counts["removed"] += 1
+                continue
+
+            entry = self.manifest.get(file_path)
+            if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                continue
+            directory, filename = os.path.split(file_path)
+            full_path = os.path.join(os.path.realpath(directory), filename)
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    movie = parse_movie_data(f.read(), file_path, full_path, {}, self._season_cache)
+            except (OSError, UnicodeDecodeError) as e:
+                counts["errors"] += 1
+                print(f"Error reading file {file_path}: {e}")
+                continue
+            self.manifest[file_path] = {"mtime": st.st_mtime_ns, "size": st.st_size,
+                                        "record": self._packer.pack(movie)}
+            counts["updated"] += 1
+
+        if counts["updated"] or counts["removed"]:
+            self._rewrite()
+            print(f"Catalog updated: {counts['updated']} changed, {counts['removed']} removed")
+        return counts
+
+    def _rewrite(self):
+        self.manifest = {path: self.manifest[path] for path in sorted(self.manifest, key=walk_order_key)}
+        sinks, outputs = open_catalog_outputs(self.output_json_file, self.output_format, self.sqlite_file,
+                                              self.shard_dir, self.shard_by, self.root_dir,
+                                              self.search_index_file)
+        with sinks:
+            for entry in self.manifest.values():
+                record = record_dict(entry["record"])
+                for output in outputs:
+                    output.write(record)
+        save_manifest(self.manifest_file, self.manifest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep a JSON catalog updated as .txt sidecars change.")
+    parser.add_argument("input_directory", nargs="?", default="../../TV Shows")
+    parser.add_argument("output_file", nargs="?", default="./tv_shows_data.json")
+    parser.add_argument("--manifest", default=None)
+    add_catalog_output_arguments(parser)
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="seconds without changes before a batch is written")
+    parser.add_argument("--max-delay", type=float, default=30.0,
+                        help="longest a change waits while a burst continues")
+    parser.add_argument("--poll-interval", type=float, default=10.0,
+                        help="seconds between scans when inotify is not available")
+    parser.add_argument("--polling", action="store_true", help="poll even if inotify is available")
+    args = parser.parse_args()
+
+    watcher = CatalogWatcher(args.input_directory, args.output_file, args.manifest, args.format,
+                             args.sqlite, args.debounce, args.max_delay, args.poll_interval,
+                             use_inotify=not args.polling, shard_dir=args.shards, shard_by=args.shard_by,
+                             search_index_file=args.search_index)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass